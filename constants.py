@@ -31,6 +31,30 @@ EBS_VOLUME_TYPE: str = "gp3"
 CAPACITY_RESERVATION_PREFERENCE: str = "none"
 MIN_INSTANCE_COUNT: int = 1
 MAX_INSTANCE_COUNT: int = 1
+# maximum number of EC2 instances launched concurrently
+MAX_PARALLEL_EC2_INSTANCE_LAUNCHES: int = 16
+# number of instance ids sent in a single DescribeInstances call
+DESCRIBE_INSTANCES_BATCH_SIZE: int = 200
+# polling of the instance state after launch until the instances are running
+EC2_INSTANCE_RUNNING_CHECK_INTERVAL_IN_SECONDS: int = 5
+EC2_INSTANCE_RUNNING_MAX_CHECKS: int = 60
+
+# botocore client configuration shared by all the boto3 clients and resources,
+# tcp keep-alive lets repeated AWS API calls reuse the same connection instead
+# of paying for a new TLS handshake on every call
+BOTO3_MAX_POOL_CONNECTIONS: int = 64
+BOTO3_MAX_RETRY_ATTEMPTS: int = 10
+BOTO3_RETRY_MODE: str = "adaptive"
+# fail fast on an unreachable endpoint, the read timeout is left at the botocore
+# default so that slow but successful calls such as RunInstances are not retried
+BOTO3_CONNECT_TIMEOUT_IN_SECONDS: int = 5
+BOTO3_READ_TIMEOUT_IN_SECONDS: int = 60
+
+# the instance metadata service answers within milliseconds on EC2, the short
+# timeout keeps get_region from hanging when not running on EC2
+IMDS_ENDPOINT: str = "http://169.254.169.254"
+IMDS_TOKEN_TTL_IN_SECONDS: int = 21600
+IMDS_REQUEST_TIMEOUT_IN_SECONDS: int = 2
 
 # all region specific AMI mapping information for gpu/neuron based instances
 # are given in this "ami_mapping.yml" file. This file currently contains information
@@ -49,6 +73,24 @@ STARTUP_COMPLETE_FLAG_FPATH: str = "/tmp/startup_complete.flag"
 FMBENCH_TEST_COMPLETE_FLAG_FPATH: str = "/tmp/fmbench_completed.flag"
 MAX_WAIT_TIME_FOR_STARTUP_SCRIPT_IN_SECONDS: int = 1500
 SCRIPT_CHECK_INTERVAL_IN_SECONDS: int = 60
+# sizing of the thread pool used for the blocking SSH and EC2 calls made while
+# benchmarking, these calls are I/O bound so the pool grows with the instances
+MIN_ASYNC_EXECUTOR_WORKERS: int = 32
+ASYNC_EXECUTOR_WORKERS_PER_INSTANCE: int = 4
+# SSH connections to the instances are kept open and reused for the whole run,
+# keep-alive packets stop idle connections from being dropped while fmbench runs
+SSH_BANNER_TIMEOUT_IN_SECONDS: int = 60
+SSH_KEEPALIVE_INTERVAL_IN_SECONDS: int = 30
+# timeouts on the blocking SSH operations so that an unresponsive instance makes
+# the operation fail instead of blocking the calling thread indefinitely
+SSH_CONNECT_TIMEOUT_IN_SECONDS: int = 30
+SSH_CHANNEL_TIMEOUT_IN_SECONDS: int = 60
+# number of files uploaded to an instance at the same time, each upload uses its
+# own channel on the instance's SSH connection
+MAX_PARALLEL_FILE_UPLOADS_PER_INSTANCE: int = 4
+# maximum number of existing instances the startup script is uploaded to and
+# started on concurrently
+MAX_PARALLEL_STARTUP_SCRIPT_UPLOADS: int = 16
 FMBENCH_LOG_PATH: str = "~/fmbench.log"
 FMBENCH_LOG_REMOTE_PATH: str = "/home/{username}/fmbench.log"
 CLOUD_INITLOG_PATH: str = "/var/log/cloud-init-output.log"
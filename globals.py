@@ -1,23 +1,32 @@
 import os
 import json
-import boto3
 import logging
 import requests
-import paramiko
-from constants import *
-from typing import Tuple
+import functools
+from typing import Optional, Dict, Tuple
 from utils import authorize_inbound_rules, create_key_pair
 from botocore.exceptions import NoCredentialsError, ClientError
 from utils import create_security_group, load_yaml_file, _get_ec2_hostname_and_username, get_region
+from utils import _get_security_group_id_by_name
+from utils import _get_boto3_client, _get_ssh_client
 
 # set a logger
 logger = logging.getLogger(__name__)
 
 config_data = {}
 
+@functools.lru_cache(maxsize=1)
+def _get_caller_identity() -> Dict:
+    """
+    Returns the STS caller identity, the identity does not change during a run
+    so it is fetched only once per process.
+    """
+    return _get_boto3_client("sts").get_caller_identity()
+
+
 def get_iam_role() -> str:
     try:
-        caller = boto3.client("sts").get_caller_identity()
+        caller = _get_caller_identity()
         account_id = caller.get("Account")
         role_arn_from_env = os.environ.get("FMBENCH_ROLE_ARN")
         if role_arn_from_env:
@@ -49,151 +58,216 @@ def get_iam_role() -> str:
     return arn_string
 
 
-def create_iam_instance_profile_arn():
+# IAM policies for the fmbench instance profile
+_FMBENCH_ROLE_NAME: str = "fmbench"
+_FMBENCH_POLICY: Dict = {
+    "Version": "2012-10-17",
+    "Statement": [
+        {
+            "Effect": "Allow",
+            "Action": [
+                "ecr:GetAuthorizationToken",
+                "ecr:BatchCheckLayerAvailability",
+                "ecr:GetDownloadUrlForLayer",
+                "ecr:BatchGetImage",
+                "ecr:ListImages",
+            ],
+            "Resource": "*",
+        },
+        {
+            "Effect": "Allow",
+            "Action": [
+                "ec2:RunInstances",
+                "ec2:DescribeInstances",
+                "ec2:CreateTags",
+                "ec2:StartInstances",
+                "ec2:StopInstances",
+                "ec2:RebootInstances",
+            ],
+            "Resource": [
+                "arn:aws:ec2:*:*:instance/*",
+                "arn:aws:ec2:*:*:volume/*",
+                "arn:aws:ec2:*:*:network-interface/*",
+                "arn:aws:ec2:*:*:key-pair/*",
+                "arn:aws:ec2:*:*:security-group/*",
+                "arn:aws:ec2:*:*:subnet/*",
+                "arn:aws:ec2:*:*:image/*",
+            ],
+        },
+        {
+            "Effect": "Allow",
+            "Action": [
+                "ec2:CreateSecurityGroup",
+                "ec2:AuthorizeSecurityGroupIngress",
+                "ec2:AuthorizeSecurityGroupEgress",
+                "ec2:DescribeSecurityGroups",
+            ],
+            "Resource": "*",
+        },
+        {
+            "Effect": "Allow",
+            "Action": ["ec2:CreateKeyPair", "ec2:DescribeKeyPairs"],
+            "Resource": "*",
+        },
+        {
+            "Effect": "Allow",
+            "Action": [
+                "ec2:CreateTags",
+                "ec2:DescribeInstances",
+                "ec2:TerminateInstances",
+                "ec2:DescribeInstanceStatus",
+                "ec2:DescribeAddresses",
+                "ec2:AssociateAddress",
+                "ec2:DisassociateAddress",
+                "ec2:DescribeRegions",
+                "ec2:DescribeImages",
+                "ec2:DescribeAvailabilityZones",
+            ],
+            "Resource": "*",
+        },
+        {
+            "Effect": "Allow",
+            "Action": "iam:PassRole",
+            "Resource": [f"arn:aws:iam::*:role/{_FMBENCH_ROLE_NAME}*"],
+        },
+    ],
+}
+
+_EC2_ASSUME_ROLE_POLICY: Dict = {
+    "Version": "2012-10-17",
+    "Statement": [
+        {
+            "Effect": "Allow",
+            "Principal": {"Service": "ec2.amazonaws.com"},
+            "Action": "sts:AssumeRole",
+        }
+    ],
+}
 
-    iam_client = boto3.client("iam")
-    role_name: str = "fmbench"
+# managed policies attached to the instance profile role
+_FMBENCH_MANAGED_POLICY_ARNS: Tuple[str, ...] = (
+    "arn:aws:iam::aws:policy/AmazonSageMakerFullAccess",
+    "arn:aws:iam::aws:policy/AmazonS3FullAccess",
+    "arn:aws:iam::aws:policy/AWSCloudFormationReadOnlyAccess",
+    "arn:aws:iam::aws:policy/AmazonBedrockFullAccess",
+)
 
-    instance_profile_arn: Optional[str] = None
-    instance_profile_role_name: str = config_data["aws"].get(
-        "iam_instance_profile_arn", "fmbench_orchestrator_role_new"
-    )
 
+def _ensure_iam_policy(iam_client, policy_name: str, policy_document: str) -> str:
+    """
+    Returns the ARN of the customer managed IAM policy with the given name, the policy
+    is only created if it does not exist yet.
+    """
+    caller = _get_caller_identity()
+    partition = caller["Arn"].split(":")[1]
+    policy_arn = f"arn:{partition}:iam::{caller['Account']}:policy/{policy_name}"
     try:
-        policy = {
-            "Version": "2012-10-17",
-            "Statement": [
-                {
-                    "Effect": "Allow",
-                    "Action": [
-                        "ecr:GetAuthorizationToken",
-                        "ecr:BatchCheckLayerAvailability",
-                        "ecr:GetDownloadUrlForLayer",
-                        "ecr:BatchGetImage",
-                        "ecr:ListImages",
-                    ],
-                    "Resource": "*",
-                },
-                {
-                    "Effect": "Allow",
-                    "Action": [
-                        "ec2:RunInstances",
-                        "ec2:DescribeInstances",
-                        "ec2:CreateTags",
-                        "ec2:StartInstances",
-                        "ec2:StopInstances",
-                        "ec2:RebootInstances",
-                    ],
-                    "Resource": [
-                        "arn:aws:ec2:*:*:instance/*",
-                        "arn:aws:ec2:*:*:volume/*",
-                        "arn:aws:ec2:*:*:network-interface/*",
-                        "arn:aws:ec2:*:*:key-pair/*",
-                        "arn:aws:ec2:*:*:security-group/*",
-                        "arn:aws:ec2:*:*:subnet/*",
-                        "arn:aws:ec2:*:*:image/*",
-                    ],
-                },
-                {
-                    "Effect": "Allow",
-                    "Action": [
-                        "ec2:CreateSecurityGroup",
-                        "ec2:AuthorizeSecurityGroupIngress",
-                        "ec2:AuthorizeSecurityGroupEgress",
-                        "ec2:DescribeSecurityGroups",
-                    ],
-                    "Resource": "*",
-                },
-                {
-                    "Effect": "Allow",
-                    "Action": ["ec2:CreateKeyPair", "ec2:DescribeKeyPairs"],
-                    "Resource": "*",
-                },
-                {
-                    "Effect": "Allow",
-                    "Action": [
-                        "ec2:CreateTags",
-                        "ec2:DescribeInstances",
-                        "ec2:TerminateInstances",
-                        "ec2:DescribeInstanceStatus",
-                        "ec2:DescribeAddresses",
-                        "ec2:AssociateAddress",
-                        "ec2:DisassociateAddress",
-                        "ec2:DescribeRegions",
-                        "ec2:DescribeImages",
-                        "ec2:DescribeAvailabilityZones",
-                    ],
-                    "Resource": "*",
-                },
-                {
-                    "Effect": "Allow",
-                    "Action": "iam:PassRole",
-                    "Resource": [f"arn:aws:iam::*:role/{role_name}*"],
-                },
-            ],
-        }
+        iam_client.get_policy(PolicyArn=policy_arn)
+        logger.info(f"IAM policy {policy_arn} already exists")
+    except iam_client.exceptions.NoSuchEntityException:
+        try:
+            policy_response = iam_client.create_policy(
+                PolicyName=policy_name, PolicyDocument=policy_document
+            )
+            policy_arn = policy_response["Policy"]["Arn"]
+            logger.info(f"IAM policy {policy_arn} created")
+        except iam_client.exceptions.EntityAlreadyExistsException:
+            logger.info(f"IAM policy {policy_arn} was created concurrently")
+    return policy_arn
 
-        policy_response = iam_client.create_policy(
-            PolicyName="CustomPolicy", PolicyDocument=json.dumps(policy)
-        )
 
-        # Create IAM role
-        assume_role_policy_document = {
-            "Version": "2012-10-17",
-            "Statement": [
-                {
-                    "Effect": "Allow",
-                    "Principal": {"Service": "ec2.amazonaws.com"},
-                    "Action": "sts:AssumeRole",
-                }
-            ],
-        }
+def _ensure_iam_role(iam_client, role_name: str, assume_role_policy_document: str):
+    """
+    Creates the IAM role with the given trust policy if it does not exist yet.
+    """
+    try:
+        iam_client.get_role(RoleName=role_name)
+        logger.info(f"IAM role {role_name} already exists")
+    except iam_client.exceptions.NoSuchEntityException:
+        try:
+            iam_client.create_role(
+                RoleName=role_name,
+                AssumeRolePolicyDocument=assume_role_policy_document,
+            )
+            logger.info(f"IAM role {role_name} created")
+        except iam_client.exceptions.EntityAlreadyExistsException:
+            logger.info(f"IAM role {role_name} was created concurrently")
 
-        iam_client.create_role(
-            RoleName=instance_profile_role_name,
-            AssumeRolePolicyDocument=json.dumps(assume_role_policy_document),
-        )
 
-        iam_client.attach_role_policy(
-            RoleName=instance_profile_role_name,
-            PolicyArn=policy_response["Policy"]["Arn"],
+def _ensure_iam_instance_profile(iam_client, instance_profile_name: str, role_name: str) -> str:
+    """
+    Returns the ARN of the instance profile with the given name after making sure that it
+    exists and contains the role, the profile is only created and the role only added
+    when they are missing.
+    """
+    try:
+        instance_profile = iam_client.get_instance_profile(
+            InstanceProfileName=instance_profile_name
+        )["InstanceProfile"]
+        logger.info(f"Instance profile {instance_profile_name} already exists")
+    except iam_client.exceptions.NoSuchEntityException:
+        try:
+            instance_profile = iam_client.create_instance_profile(
+                InstanceProfileName=instance_profile_name
+            )["InstanceProfile"]
+            logger.info(f"Instance profile created: {instance_profile}")
+        except iam_client.exceptions.EntityAlreadyExistsException:
+            logger.info(f"Instance profile {instance_profile_name} was created concurrently")
+            instance_profile = iam_client.get_instance_profile(
+                InstanceProfileName=instance_profile_name
+            )["InstanceProfile"]
+
+    if role_name not in [role["RoleName"] for role in instance_profile.get("Roles", [])]:
+        # Add role to instance profile
+        iam_client.add_role_to_instance_profile(
+            InstanceProfileName=instance_profile_name,
+            RoleName=role_name,
         )
+    return instance_profile.get("Arn")
 
-        # Attach managed policies to the role
-        managed_policies = [
-            "arn:aws:iam::aws:policy/AmazonSageMakerFullAccess",
-            "arn:aws:iam::aws:policy/AmazonS3FullAccess",
-            "arn:aws:iam::aws:policy/AWSCloudFormationReadOnlyAccess",
-            "arn:aws:iam::aws:policy/AmazonBedrockFullAccess",
-        ]
-
-        for policy_arn in managed_policies:
-            iam_client.attach_role_policy(
-                RoleName=instance_profile_role_name, PolicyArn=policy_arn
-            )
 
-        # Create instance profile
-        instance_profile_info = iam_client.create_instance_profile(
-            InstanceProfileName="FMBenchOrchestratorInstanceProfile_new"
-        )
+def _get_or_create_iam_instance_profile_arn(instance_profile_role_name: str) -> str:
+    """
+    Makes sure that the fmbench policy, role and instance profile exist and returns the
+    instance profile ARN. Every IAM resource is looked up first and only created when
+    missing.
+    """
+    iam_client = _get_boto3_client("iam")
 
-        if instance_profile_info is not None:
-            logger.info(f"Instance profile created: {instance_profile_info}")
-            instance_profile_arn = instance_profile_info["InstanceProfile"].get("Arn")
+    policy_arn = _ensure_iam_policy(iam_client, "CustomPolicy", json.dumps(_FMBENCH_POLICY))
 
-        # Add role to instance profile
-        iam_client.add_role_to_instance_profile(
-            InstanceProfileName="FMBenchOrchestratorInstanceProfile_new",
-            RoleName=instance_profile_role_name,
+    # Create IAM role
+    _ensure_iam_role(iam_client, instance_profile_role_name, json.dumps(_EC2_ASSUME_ROLE_POLICY))
+
+    # attaching a policy that is already attached is a no-op
+    iam_client.attach_role_policy(
+        RoleName=instance_profile_role_name,
+        PolicyArn=policy_arn,
+    )
+
+    # Attach managed policies to the role
+    for policy_arn in _FMBENCH_MANAGED_POLICY_ARNS:
+        iam_client.attach_role_policy(
+            RoleName=instance_profile_role_name, PolicyArn=policy_arn
         )
 
+    return _ensure_iam_instance_profile(
+        iam_client, "FMBenchOrchestratorInstanceProfile_new", instance_profile_role_name
+    )
+
+
+def create_iam_instance_profile_arn():
+    instance_profile_arn: Optional[str] = None
+    instance_profile_role_name: str = config_data["aws"].get(
+        "iam_instance_profile_arn", "fmbench_orchestrator_role_new"
+    )
+
+    try:
+        instance_profile_arn = _get_or_create_iam_instance_profile_arn(instance_profile_role_name)
         print("Instance profile created and role attached successfully.")
-        return instance_profile_arn
     except ClientError as e:
-        if e.response["Error"]["Code"] == "InvalidPermission.Duplicate":
-            logger.info(f"Iam instance profile already exists. Skipping...")
-        else:
-            logger.error(f"Error creating the instance profile iam: {e}")
+        logger.error(f"Error creating the instance profile iam: {e}")
+    return instance_profile_arn
 
 
 def upload_and_run_script(
@@ -207,7 +281,6 @@ def upload_and_run_script(
     Runs the user data as a script in the case of which an instance is pre existing. This is because
     the user script of an instance can only be modified when it is stopped.
     """
-    ec2_client = boto3.client("ec2", region_name=region)
     has_start_up_script_executed: bool = False
     try:
         # Get instance public IP
@@ -218,14 +291,8 @@ def upload_and_run_script(
         logger.info(
             f"hostname={public_hostname}, username={username}, instance_name={instance_name}"
         )
-        # Create SSH client
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-        # Connect to the instance
-        ssh.connect(
-            hostname=public_hostname, username=username, key_filename=private_key_path
-        )
+        # Get the SSH connection to the instance, it is reused later while benchmarking
+        ssh = _get_ssh_client(public_hostname, username, private_key_path)
 
         # Upload the script
         with ssh.open_sftp() as sftp:
@@ -242,7 +309,8 @@ def upload_and_run_script(
         #     logger.info(line.strip('\n'))
         # for line in stderr:
         #     logger.info(line.strip('\n'))
-        ssh.close()
+        # close the channel of the command, the connection itself stays open for reuse
+        stdout.channel.close()
         logger.info(f"Script uploaded and executed on instance {instance_id}")
         has_start_up_script_executed = True
     except Exception as e:
@@ -252,21 +320,35 @@ def upload_and_run_script(
     return has_start_up_script_executed
 
 
-def get_sg_id(region: str) -> str:
+@functools.lru_cache(maxsize=32)
+def get_sg_id(region: str, create: bool = True) -> str:
     # Append the region to the group name
     GROUP_NAME = f"{config_data['security_group'].get('group_name')}-{region}"
     DESCRIPTION = config_data["security_group"].get("description", " ")
     VPC_ID = config_data["security_group"].get("vpc_id")
 
+    if not create:
+        # security group creation is turned off, the group must already exist
+        sg_id = _get_security_group_id_by_name(region, GROUP_NAME, VPC_ID)
+        if sg_id is None:
+            raise ValueError(
+                f"security group creation is disabled and security group '{GROUP_NAME}' was not found in {region}"
+            )
+        logger.info(f"Using existing security group '{GROUP_NAME}' ({sg_id}) in {region}")
+        return sg_id
+
     try:
         # Create or get the security group with the region-specific name
         sg_id = create_security_group(region, GROUP_NAME, DESCRIPTION, VPC_ID)
         logger.info(f"Security group '{GROUP_NAME}' created or imported in {region}")
 
-        if sg_id:
-            # Add inbound rules if security group was created or imported successfully
-            authorize_inbound_rules(sg_id, region)
-            logger.info(f"Inbound rules added to security group '{GROUP_NAME}'")
+        # raise instead of returning None so that a failure is not cached for the region
+        if not sg_id:
+            raise ValueError(f"security group '{GROUP_NAME}' could not be created or found in {region}")
+
+        # Add inbound rules if security group was created or imported successfully
+        authorize_inbound_rules(sg_id, region)
+        logger.info(f"Inbound rules added to security group '{GROUP_NAME}'")
 
         return sg_id
 
@@ -277,6 +359,9 @@ def get_sg_id(region: str) -> str:
         raise  # Re-raise the exception for further handling if needed
 
 
+# the key pair of a region is created or checked once, instances in the same
+# region share it
+@functools.lru_cache(maxsize=32)
 def get_key_pair(region):
     # Create 'key_pair' directory if it doesn't exist
     key_pair_dir = "key_pair"
@@ -295,27 +380,23 @@ def get_key_pair(region):
     if config_data["run_steps"]["key_pair_generation"]:
         # First, check if the key pair file already exists
         if os.path.exists(private_key_fname):
-            try:
-                # If the key pair file exists, read it
-                with open(private_key_fname, "r") as file:
-                    private_key = file.read()
-                print(f"Using existing key pair from {private_key_fname}")
-            except IOError as e:
+            # If the key pair file exists, only its path is needed so check that
+            # it is readable instead of reading the key material
+            if not os.access(private_key_fname, os.R_OK):
                 raise ValueError(
-                    f"Error reading existing key pair file '{private_key_fname}': {e}"
+                    f"Error reading existing key pair file '{private_key_fname}': permission denied"
                 )
+            logger.info(f"Using existing key pair from {private_key_fname}")
         else:
             # If the key pair file doesn't exist, create a new key pair
             try:
                 delete_key_pair_if_present: bool = True
                 private_key = create_key_pair(key_pair_name, region, delete_key_pair_if_present)
-                # Save the key pair to the file
-                with open(private_key_fname, "w") as key_file:
+                # Save the key pair to a file that is created readable only by the owner
+                fd = os.open(private_key_fname, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o400)
+                with os.fdopen(fd, "w") as key_file:
                     key_file.write(private_key)
-
-                # Set file permissions to be readable only by the owner
-                os.chmod(private_key_fname, 0o400)
-                print(
+                logger.info(
                     f"Key pair '{key_pair_name}' created and saved as '{private_key_fname}'"
                 )
             except Exception as e:
@@ -323,12 +404,9 @@ def get_key_pair(region):
                 raise ValueError(f"Failed to create key pair '{key_pair_name}': {e}")
     else:
         # If key pair generation is disabled, attempt to use an existing key
-        try:
-            with open(private_key_fname, "r") as file:
-                private_key = file.read()
-            print(f"Using pre-existing key pair from {private_key_fname}")
-        except FileNotFoundError:
+        if not os.path.isfile(private_key_fname):
             raise ValueError(f"Key pair file not found at {private_key_fname}")
-        except IOError as e:
-            raise ValueError(f"Error reading key pair file '{private_key_fname}': {e}")
+        if not os.access(private_key_fname, os.R_OK):
+            raise ValueError(f"Error reading key pair file '{private_key_fname}': permission denied")
+        logger.info(f"Using pre-existing key pair from {private_key_fname}")
     return private_key_fname, key_pair_name
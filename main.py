@@ -1,6 +1,6 @@
 import os
+import re
 import sys
-import time
 import json
 import wget
 import yaml
@@ -12,11 +12,9 @@ import asyncio
 import globals
 import argparse
 import paramiko
-from utils import *
-from constants import *
 from pathlib import Path
 from scp import SCPClient
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
 from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import NoCredentialsError, ClientError
@@ -28,8 +26,41 @@ from globals import (
     get_key_pair,
     upload_and_run_script,
 )
+from utils import (
+    check_and_retrieve_results_folder,
+    close_ssh_clients,
+    create_ec2_instances_parallel,
+    delete_ec2_instance,
+    generate_instance_details,
+    get_fmbench_log,
+    handle_config_file_async,
+    load_yaml_file,
+    prepare_user_data,
+    reset_local_results_folder,
+    upload_and_execute_script_invoke_shell,
+    upload_file_to_instance_async,
+    wait_for_ec2_instances_running,
+    wait_for_flag_async,
+)
+from constants import (
+    CLOUD_INITLOG_PATH,
+    FMBENCH_LOG_PATH,
+    FMBENCH_LOG_REMOTE_PATH,
+    FMBENCH_TEST_COMPLETE_FLAG_FPATH,
+    INFRA_YML_FPATH,
+    MAX_PARALLEL_STARTUP_SCRIPT_UPLOADS,
+    MIN_ASYNC_EXECUTOR_WORKERS,
+    ASYNC_EXECUTOR_WORKERS_PER_INSTANCE,
+    POST_STARTUP_LOCAL_MODE_VAR,
+    POST_STARTUP_WRITE_BUCKET_VAR,
+    RESULTS_DIR,
+    SCRIPT_CHECK_INTERVAL_IN_SECONDS,
+    STARTUP_COMPLETE_FLAG_FPATH,
+    remote_script_path,
+)
 
-executor = ThreadPoolExecutor()
+# set a logger
+logger = logging.getLogger(__name__)
 
 # Initialize global variables for this file
 instance_id_list: List = []
@@ -37,6 +68,10 @@ fmbench_config_map: List = []
 fmbench_post_startup_script_map: List = []
 instance_data_map: Dict = {}
 
+# placeholders in the startup scripts that are filled in before the script is
+# passed to the instance as user data
+_USER_DATA_PLACEHOLDER_RE = re.compile(r"__(HF_TOKEN|neuron)__")
+
 logging.basicConfig(
     level=logging.INFO,  # Set the log level to INFO
     # Define log message format
@@ -48,20 +83,20 @@ logging.basicConfig(
 )
 
 
-async def execute_fmbench(instance, post_install_script, remote_script_path):
+async def execute_fmbench(instance, post_install_script_template, remote_script_path, results_folder, delete_instance):
     """
     Asynchronous wrapper for deploying an instance using synchronous functions.
     """
     # Check for the startup completion flag
-    startup_complete = await asyncio.get_event_loop().run_in_executor(
-        executor,
-        wait_for_flag,
+    startup_complete = await wait_for_flag_async(
         instance,
         STARTUP_COMPLETE_FLAG_FPATH,
         CLOUD_INITLOG_PATH,
     )
 
     if startup_complete:
+        # start from an empty local folder for this instance's logs and results
+        await asyncio.to_thread(reset_local_results_folder, instance, results_folder)
         if instance["upload_files"]:
             await upload_file_to_instance_async(
                 instance["hostname"],
@@ -69,39 +104,43 @@ async def execute_fmbench(instance, post_install_script, remote_script_path):
                 instance["key_file_path"],
                 file_paths=instance["upload_files"],
             )
-        num_configs: int = len(instance["config_file"])
-        for cfg_idx, config_file in enumerate(instance["config_file"]):
+        instance_name = instance["instance_name"]
+        local_mode_param = POST_STARTUP_LOCAL_MODE_VAR
+        write_bucket_param = POST_STARTUP_WRITE_BUCKET_VAR
+
+        # override defaults for post install script params if specified, these are
+        # the same for every config of the instance
+        pssp = instance.get("post_startup_script_params")
+        if pssp is not None:
+            local_mode_param = pssp.get("local_mode", local_mode_param)
+            write_bucket_param = pssp.get("write_bucket", write_bucket_param)
+
+        # Convert `local_mode_param` to "yes" or "no" if it is a boolean
+        if isinstance(local_mode_param, bool):
+            local_mode_param = "yes" if local_mode_param else "no"
+
+        config_files: List[str] = instance["config_file"]
+        num_configs: int = len(config_files)
+        # download/upload of the next config file, started while the current one is benchmarking
+        next_config_task: Optional[asyncio.Task] = None
+        for cfg_idx, config_file in enumerate(config_files):
             cfg_idx += 1
-            instance_name = instance["instance_name"]
-            local_mode_param = POST_STARTUP_LOCAL_MODE_VAR
-            write_bucket_param = POST_STARTUP_WRITE_BUCKET_VAR
-
             logger.info(
-                f"going to run config {cfg_idx} of {num_configs} for instance {instance_name}"
+                "going to run config %d of %d for instance %s", cfg_idx, num_configs, instance_name
             )
-            # Handle configuration file (download/upload) and get the remote path
-            remote_config_path = await handle_config_file_async(instance, config_file)
+            # Handle configuration file (download/upload) and get the remote path, this
+            # would already be in progress if it was prefetched during the previous config
+            if next_config_task is not None:
+                remote_config_path = await next_config_task
+                next_config_task = None
+            else:
+                remote_config_path = await handle_config_file_async(instance, config_file)
             # Format the script with the remote config file path
             # Change this later to be a better implementation, right now it is bad.
-
-            # override defaults for post install script params if specified
-            pssp = instance.get("post_startup_script_params")
-            if pssp is not None:
-                local_mode_param = pssp.get("local_mode", local_mode_param)
-                write_bucket_param = pssp.get("write_bucket", write_bucket_param)
-
-            # Convert `local_mode_param` to "yes" or "no" if it is a boolean
-            if isinstance(local_mode_param, bool):
-                local_mode_param = "yes" if local_mode_param else "no"
-
-            formatted_script = (
-                Path(post_install_script)
-                .read_text()
-                .format(
-                    config_file=remote_config_path,
-                    local_mode=local_mode_param,
-                    write_bucket=write_bucket_param,
-                )
+            formatted_script = post_install_script_template.format(
+                config_file=remote_config_path,
+                local_mode=local_mode_param,
+                write_bucket=write_bucket_param,
             )
 
             
@@ -112,8 +151,9 @@ async def execute_fmbench(instance, post_install_script, remote_script_path):
             retry_sleep = 60
             while True:
                 logger.info("Startup Script complete, executing fmbench now")
-                script_output = await asyncio.get_event_loop().run_in_executor(
-                    executor,
+                # the SSH operations in here have their own timeouts, a hung connection
+                # makes this return an empty output and is dropped before the retry
+                script_output = await asyncio.to_thread(
                     upload_and_execute_script_invoke_shell,
                     instance["hostname"],
                     instance["username"],
@@ -121,24 +161,32 @@ async def execute_fmbench(instance, post_install_script, remote_script_path):
                     formatted_script,
                     remote_script_path,
                 )
-                logger.info(f"Script Output from {instance['hostname']}:\n{script_output}")
+                logger.info("Script Output from %s:\n%s", instance["hostname"], script_output)
                 if script_output != "":
                     break
                 else:
-                    logger.error(f"post startup script not successfull after {retries}")
+                    logger.error("post startup script not successfull after %d", retries)
                     if retries < max_retries:
-                        logger.error(f"post startup script retries={retries}, trying after a {retry_sleep}s sleep")
+                        logger.error("post startup script retries=%d, trying after a %ds sleep", retries, retry_sleep)
                     else:
-                        logger.error(f"post startup script retries={retries}, not retrying any more, benchmarking "
-                                    f"for instance={instance} will fail....")
+                        logger.error("post startup script retries=%d, not retrying any more, benchmarking "
+                                     "for instance=%s will fail....", retries, instance)
                         break
-                time.sleep(retry_sleep)
+                await asyncio.sleep(retry_sleep)
                 retries += 1
 
+            # stage the next config file on the instance while fmbench runs this one, the
+            # config is uploaded by its file name so only prefetch when that does not
+            # overwrite the config file that is currently in use
+            if cfg_idx < num_configs:
+                next_config_file = config_files[cfg_idx]
+                if os.path.basename(next_config_file) != os.path.basename(config_file):
+                    next_config_task = asyncio.create_task(
+                        handle_config_file_async(instance, next_config_file)
+                    )
+
             # Check for the fmbench completion flag
-            fmbench_complete = await asyncio.get_event_loop().run_in_executor(
-                executor,
-                wait_for_flag,
+            fmbench_complete = await wait_for_flag_async(
                 instance,
                 FMBENCH_TEST_COMPLETE_FLAG_FPATH,
                 FMBENCH_LOG_PATH,
@@ -146,45 +194,65 @@ async def execute_fmbench(instance, post_install_script, remote_script_path):
                 SCRIPT_CHECK_INTERVAL_IN_SECONDS,
             )
 
+            if fmbench_complete:
+                logger.info("Fmbench Run successful, Getting the folders now")
+                # the download copies every results-* folder on the instance, it has to
+                # complete before the next config starts writing its results there
+                await asyncio.to_thread(
+                    check_and_retrieve_results_folder,
+                    instance,
+                    results_folder,
+                )
             logger.info("Going to get fmbench.log from the instance now")
-            results_folder = os.path.join(
-                RESULTS_DIR, globals.config_data["general"]["name"]
-            )
-            # Get Log even if fmbench_completes or not
-            await asyncio.get_event_loop().run_in_executor(
-                executor,
+            # Get Log even if fmbench_completes or not, the next config overwrites
+            # fmbench.log so this download has to complete before moving on
+            await asyncio.to_thread(
                 get_fmbench_log,
                 instance,
                 results_folder,
                 FMBENCH_LOG_REMOTE_PATH,
                 cfg_idx,
             )
-
-            if fmbench_complete:
-                logger.info("Fmbench Run successful, Getting the folders now")
-                await asyncio.get_event_loop().run_in_executor(
-                    executor,
-                    check_and_retrieve_results_folder,
-                    instance,
-                    results_folder,
-                )
-        if globals.config_data["run_steps"]["delete_ec2_instance"]:
-            delete_ec2_instance(instance["instance_id"], instance["region"])
+        if delete_instance:
+            # the instance is going away, close the SSH connections to it first
+            close_ssh_clients(instance["hostname"])
+            # terminate the instance in a separate thread so that the blocking EC2 API
+            # call does not stall the other instances' coroutines
+            await asyncio.to_thread(
+                delete_ec2_instance,
+                instance["instance_id"],
+                instance["region"],
+            )
             instance_id_list.remove(instance["instance_id"])
 
 
 async def multi_deploy_fmbench(instance_details, remote_script_path):
     tasks = []
+    # post startup script templates keyed by path, instances usually share the same
+    # script so each template is read from disk only once
+    post_startup_script_templates: Dict[str, str] = {}
+    # all instances write their results under the same folder for this run
+    results_folder: str = os.path.join(RESULTS_DIR, globals.config_data["general"]["name"])
+    delete_instance: bool = globals.config_data["run_steps"]["delete_ec2_instance"]
 
     # Create a task for each instance
     for instance in instance_details:
         # Make this async as well?
         # Format the script with the specific config file
         logger.info(f"Instance Details are: {instance}")
+        post_startup_script = instance["post_startup_script"]
+        if post_startup_script not in post_startup_script_templates:
+            post_startup_script_templates[post_startup_script] = Path(
+                post_startup_script
+            ).read_text()
         # Create an async task for this instance
         tasks.append(
             execute_fmbench(
-                instance, instance["post_startup_script"], remote_script_path
+                instance,
+                post_startup_script_templates[post_startup_script],
+                remote_script_path,
+                results_folder,
+                delete_instance,
             )
         )
 
@@ -193,7 +261,21 @@ async def multi_deploy_fmbench(instance_details, remote_script_path):
 
 
 async def main():
-    await multi_deploy_fmbench(instance_details, remote_script_path)
+    # the blocking SSH and EC2 calls are run through asyncio.to_thread, size its default
+    # executor on the number of instances so that instances do not queue behind each other
+    num_workers: int = max(
+        MIN_ASYNC_EXECUTOR_WORKERS,
+        ASYNC_EXECUTOR_WORKERS_PER_INSTANCE * len(instance_details),
+    )
+    # named threads make it easy to tell the orchestrator's blocking calls apart in stack
+    # dumps, asyncio.run shuts this executor down once benchmarking completes
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="fmbench-orchestrator")
+    )
+    try:
+        await multi_deploy_fmbench(instance_details, remote_script_path)
+    finally:
+        close_ssh_clients()
 
 
 if __name__ == "__main__":
@@ -235,34 +317,40 @@ if __name__ == "__main__":
     )
 
     args = parser.parse_args()
-    logger.info(f"main, {args} = args")
+    logger.info("main, %s = args", args)
 
     globals.config_data = load_yaml_file(args.config_file,
                                          args.ami_mapping_file,
                                          args.fmbench_config_file,
                                          args.infra_config_file,
                                          args.write_bucket)
-    logger.info(f"Loaded Config {json.dumps(globals.config_data, indent=2)}")
+    # the config dump can be large, only serialize it when it is going to be logged
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Loaded Config %s", json.dumps(globals.config_data, indent=2))
 
-    hf_token_fpath = globals.config_data["aws"].get("hf_token_fpath")
-    hf_token: Optional[str] = None
-    logger.info(f"Got Hugging Face Token file path from config. {hf_token_fpath}")
-    logger.info("Attempting to open it")
-
-    if Path(hf_token_fpath).is_file():
-        hf_token = Path(hf_token_fpath).read_text().strip()
-    else:
-        logger.error(f"{hf_token_fpath} does not exist, cannot continue")
-        sys.exit(1)
-
-    logger.info(f"read hugging face token {hf_token} from file path")
-    assert len(hf_token) > 4, "Hf_token is too small or invalid, please check"
-
-    for i in globals.config_data["instances"]:
-        logger.info(f"Instance list is as follows: {i}")
+    if logger.isEnabledFor(logging.INFO):
+        for i in globals.config_data["instances"]:
+            logger.info("Instance list is as follows: %s", i)
 
     logger.info(f"Deploying Ec2 Instances")
     if globals.config_data["run_steps"]["deploy_ec2_instance"]:
+        # the hugging face token is only needed for the startup scripts of the
+        # instances being deployed, so it is read only when deploying
+        hf_token_fpath = globals.config_data["aws"].get("hf_token_fpath")
+        hf_token: Optional[str] = None
+        logger.info(f"Got Hugging Face Token file path from config. {hf_token_fpath}")
+        logger.info("Attempting to open it")
+
+        if Path(hf_token_fpath).is_file():
+            hf_token = Path(hf_token_fpath).read_text().strip()
+        else:
+            logger.error(f"{hf_token_fpath} does not exist, cannot continue")
+            sys.exit(1)
+
+        # never log the token itself, it ends up in the orchestrator log file
+        logger.info("read hugging face token of length %d from file path", len(hf_token))
+        assert len(hf_token) > 4, "Hf_token is too small or invalid, please check"
+
         try:
             iam_arn = get_iam_role()
         except Exception as e:
@@ -276,39 +364,80 @@ if __name__ == "__main__":
             )
 
         logger.info(f"iam arn: {iam_arn}")
-        # WIP Parallelize This.
         num_instances: int = len(globals.config_data["instances"])
+        # parameters and instance data for the instances to be created
+        new_instance_specs: List[Dict] = []
+        new_instance_data: List[Dict] = []
+        # parameters and instance data for the existing instances the startup script
+        # is uploaded to, the uploads run in parallel once all instances have been processed
+        existing_instance_specs: List[Dict] = []
+        existing_instance_data: List[Dict] = []
+        # values for the placeholders in the startup scripts
+        user_data_placeholders: Dict[str, str] = {"HF_TOKEN": hf_token, "neuron": "True"}
+        # rendered startup scripts keyed by path, instances usually share the same
+        # script so each one is read from disk and rendered only once
+        startup_scripts: Dict[str, str] = {}
+        # the security group and key pair are shared by all the instances of a region,
+        # resolve them once per region before going through the instances
+        default_region = globals.config_data["aws"].get("region")
+        deploy_regions = {
+            instance.get("region", default_region)
+            for instance in globals.config_data["instances"]
+            if instance.get("deploy", True) is not False
+        }
+        region_sg_ids: Dict[str, str] = {}
+        region_key_pairs: Dict[str, Tuple[str, str]] = {}
+        for region in deploy_regions:
+            if globals.config_data["run_steps"]["security_group_creation"]:
+                logger.info(
+                    "Creating Security Groups in %s. getting them by name if they exist", region
+                )
+                region_sg_ids[region] = get_sg_id(region)
+            else:
+                # the security group is not created, look up the existing one so that
+                # the security group id is always set for the instances
+                region_sg_ids[region] = get_sg_id(region, create=False)
+            if region is not None:
+                region_key_pairs[region] = get_key_pair(region)
+            else:
+                logger.error(
+                    "Region is not provided in the configuration file. Make sure the region exists. Region: %s",
+                    region,
+                )
         for idx, instance in enumerate(globals.config_data["instances"]):
             idx += 1
             logger.info(
-                f"going to create instance {idx} of {num_instances}, instance={instance}"
+                "going to create instance %d of %d, instance_type=%s, ami_id=%s, region=%s",
+                idx,
+                num_instances,
+                instance.get("instance_type"),
+                instance.get("ami_id"),
+                instance.get("region"),
             )
             deploy: bool = instance.get("deploy", True)
             if deploy is False:
                 logger.warning(
-                    f"deploy={deploy} for instance={json.dumps(instance, indent=2)}, skipping it..."
+                    "deploy=%s for instance %d, instance_type=%s, skipping it...",
+                    deploy,
+                    idx,
+                    instance.get("instance_type"),
                 )
                 continue
-            region = instance.get("region", globals.config_data["aws"].get("region"))
+            region = instance.get("region", default_region)
             startup_script = instance["startup_script"]
-            logger.info(f"Region Set for instance is: {region}")
-            if globals.config_data["run_steps"]["security_group_creation"]:
-                logger.info(
-                    f"Creating Security Groups. getting them by name if they exist"
-                )
-                sg_id = get_sg_id(region)
-            if region is not None:
-                PRIVATE_KEY_FNAME, PRIVATE_KEY_NAME = get_key_pair(region)
-            else:
-                logger.error(
-                    f"Region is not provided in the configuration file. Make sure the region exists. Region: {region}"
-                )
+            logger.info("Region Set for instance is: %s", region)
+            sg_id = region_sg_ids[region]
+            if region in region_key_pairs:
+                PRIVATE_KEY_FNAME, PRIVATE_KEY_NAME = region_key_pairs[region]
             # command_to_run = instance["command_to_run"]
-            with open(f"{startup_script}", "r") as file:
-                user_data_script = file.read()
-                # Replace the hf token in the bash script to pull the HF model
-                user_data_script = user_data_script.replace("__HF_TOKEN__", hf_token)
-                user_data_script = user_data_script.replace("__neuron__", "True")
+            if startup_script not in startup_scripts:
+                # Replace the hf token in the bash script to pull the HF model, all
+                # placeholders are substituted in a single pass over the script
+                startup_scripts[startup_script] = _USER_DATA_PLACEHOLDER_RE.sub(
+                    lambda m: user_data_placeholders[m.group(1)],
+                    Path(startup_script).read_text(),
+                )
+            user_data_script = startup_scripts[startup_script]
 
             if instance.get("instance_id") is None:
                 instance_type = instance["instance_type"]
@@ -329,48 +458,53 @@ if __name__ == "__main__":
 
                 if CapacityReservationId:
                     logger.info(
-                        f"Capacity reservation id provided: {CapacityReservationId}"
+                        "Capacity reservation id provided: %s", CapacityReservationId
                     )
                 elif CapacityReservationResourceGroupArn:
                     logger.info(
-                        f"Capacity reservation resource group ARN provided: {CapacityReservationResourceGroupArn}"
+                        "Capacity reservation resource group ARN provided: %s",
+                        CapacityReservationResourceGroupArn,
                     )
                 else:
                     logger.info(
                         "No capacity reservation specified, using default preference"
                     )
 
-                # Create an EC2 instance with the user data script
-                instance_id = create_ec2_instance(
-                    idx,
-                    PRIVATE_KEY_NAME,
-                    sg_id,
-                    user_data_script,
-                    ami_id,
-                    instance_type,
-                    iam_arn,
-                    region,
-                    device_name,
-                    ebs_del_on_termination,
-                    ebs_Iops,
-                    ebs_VolumeSize,
-                    ebs_VolumeType,
-                    CapacityReservationPreference,
-                    CapacityReservationId,
-                    CapacityReservationResourceGroupArn,
+                # Collect the parameters for creating the EC2 instance with the user data script,
+                # the instances are created in parallel once all instances have been processed
+                new_instance_specs.append(
+                    dict(
+                        idx=idx,
+                        key_name=PRIVATE_KEY_NAME,
+                        security_group_id=sg_id,
+                        user_data_script=prepare_user_data(user_data_script),
+                        ami=ami_id,
+                        instance_type=instance_type,
+                        iam_arn=iam_arn,
+                        region=region,
+                        device_name=device_name,
+                        ebs_del_on_termination=ebs_del_on_termination,
+                        ebs_Iops=ebs_Iops,
+                        ebs_VolumeSize=ebs_VolumeSize,
+                        ebs_VolumeType=ebs_VolumeType,
+                        CapacityReservationPreference=CapacityReservationPreference,
+                        CapacityReservationId=CapacityReservationId,
+                        CapacityReservationResourceGroupArn=CapacityReservationResourceGroupArn,
+                    )
+                )
+                new_instance_data.append(
+                    {
+                        "fmbench_config": instance["fmbench_config"],
+                        "post_startup_script": instance["post_startup_script"],
+                        "post_startup_script_params": instance.get(
+                            "post_startup_script_params"
+                        ),
+                        "fmbench_complete_timeout": instance["fmbench_complete_timeout"],
+                        "region": instance.get("region", region),
+                        "PRIVATE_KEY_FNAME": PRIVATE_KEY_FNAME,
+                        "upload_files": instance.get("upload_files"),
+                    }
                 )
-                instance_id_list.append(instance_id)
-                instance_data_map[instance_id] = {
-                    "fmbench_config": instance["fmbench_config"],
-                    "post_startup_script": instance["post_startup_script"],
-                    "post_startup_script_params": instance.get(
-                        "post_startup_script_params"
-                    ),
-                    "fmbench_complete_timeout": instance["fmbench_complete_timeout"],
-                    "region": instance.get("region", region),
-                    "PRIVATE_KEY_FNAME": PRIVATE_KEY_FNAME,
-                    "upload_files": instance.get("upload_files"),
-                }
             else:
                 instance_id = instance["instance_id"]
                 # TODO: Check if host machine can open the private key provided, if it cant, raise exception
@@ -379,23 +513,17 @@ if __name__ == "__main__":
                     logger.error(
                         "Private key not found, not adding instance to instance id list"
                     )
-                if upload_and_run_script(
-                    instance_id,
-                    PRIVATE_KEY_FNAME,
-                    user_data_script,
-                    instance["region"],
-                    instance["startup_script"],
-                ):
-                    logger.info(
-                        f"Startup script uploaded and executed on instance {instance_id}"
+                existing_instance_specs.append(
+                    dict(
+                        instance_id=instance_id,
+                        private_key_path=PRIVATE_KEY_FNAME,
+                        user_data_script=user_data_script,
+                        region=instance["region"],
+                        startup_script=instance["startup_script"],
                     )
-                else:
-                    logger.error(
-                        f"Failed to upload and execute startup script on instance {instance_id}"
-                    )
-                if PRIVATE_KEY_FNAME:
-                    instance_id_list.append(instance_id)
-                    instance_data_map[instance_id] = {
+                )
+                existing_instance_data.append(
+                    {
                         "fmbench_config": instance["fmbench_config"],
                         "post_startup_script": instance["post_startup_script"],
                         "fmbench_complete_timeout": instance[
@@ -408,14 +536,60 @@ if __name__ == "__main__":
                         "PRIVATE_KEY_FNAME": PRIVATE_KEY_FNAME,
                         "upload_files": instance.get("upload_files"),
                     }
+                )
 
-                logger.info(f"done creating instance {idx} of {num_instances}")
+                logger.info("done creating instance %d of %d", idx, num_instances)
 
-    sleep_time = 60
-    logger.info(
-        f"Going to Sleep for {sleep_time} seconds to make sure the instances are up"
-    )
-    time.sleep(sleep_time)
+        if existing_instance_specs:
+            logger.info(
+                f"going to upload and run the startup script on {len(existing_instance_specs)} existing instances in parallel"
+            )
+            num_workers: int = min(
+                MAX_PARALLEL_STARTUP_SCRIPT_UPLOADS, len(existing_instance_specs)
+            )
+            with ThreadPoolExecutor(max_workers=num_workers) as upload_executor:
+                upload_results = list(
+                    upload_executor.map(
+                        lambda spec: upload_and_run_script(**spec),
+                        existing_instance_specs,
+                    )
+                )
+            # the instance id list and data map are only updated here, in the order of
+            # the instances in the config, so the worker threads share no state
+            for spec, instance_data, uploaded in zip(
+                existing_instance_specs, existing_instance_data, upload_results
+            ):
+                instance_id = spec["instance_id"]
+                if uploaded:
+                    logger.info(
+                        "Startup script uploaded and executed on instance %s", instance_id
+                    )
+                else:
+                    logger.error(
+                        "Failed to upload and execute startup script on instance %s", instance_id
+                    )
+                if spec["private_key_path"]:
+                    instance_id_list.append(instance_id)
+                    instance_data_map[instance_id] = instance_data
+
+        if new_instance_specs:
+            logger.info(f"going to create {len(new_instance_specs)} instances in parallel")
+            instance_ids = create_ec2_instances_parallel(new_instance_specs)
+            for instance_id, spec, instance_data in zip(
+                instance_ids, new_instance_specs, new_instance_data
+            ):
+                if instance_id is None:
+                    logger.error(
+                        f"instance {spec['idx']} of {num_instances}, instance_type={spec['instance_type']} "
+                        f"could not be created, not adding it to the instance id list"
+                    )
+                    continue
+                instance_id_list.append(instance_id)
+                instance_data_map[instance_id] = instance_data
+
+    # wait for the instances to be up, this returns as soon as they are running
+    # instead of always sleeping for a fixed time
+    wait_for_ec2_instances_running(instance_id_list, instance_data_map)
 
     instance_details = generate_instance_details(
         instance_id_list, instance_data_map
@@ -2,31 +2,111 @@ import os
 import re
 import time
 import json
+import gzip
 import wget
 import yaml
 import boto3
 import base64
 import urllib
 import shutil
+import socket
 import logging
+import functools
+import threading
 import asyncio
 import requests
 import paramiko
-from utils import *
-from constants import *
+from constants import (
+    AMI_USERNAME_MAP,
+    BOTO3_CONNECT_TIMEOUT_IN_SECONDS,
+    BOTO3_MAX_POOL_CONNECTIONS,
+    BOTO3_MAX_RETRY_ATTEMPTS,
+    BOTO3_READ_TIMEOUT_IN_SECONDS,
+    BOTO3_RETRY_MODE,
+    DEFAULT_DEVICE_NAME,
+    DEFAULT_EC2_USERNAME,
+    DESCRIBE_INSTANCES_BATCH_SIZE,
+    DOWNLOAD_DIR_FOR_CFG_FILES,
+    EC2_INSTANCE_RUNNING_CHECK_INTERVAL_IN_SECONDS,
+    EC2_INSTANCE_RUNNING_MAX_CHECKS,
+    EBS_IOPS,
+    EBS_VOLUME_SIZE,
+    EBS_VOLUME_TYPE,
+    FMBENCH_CFG_GH_PREFIX,
+    FMBENCH_CFG_PREFIX,
+    FMBENCH_PACKAGE_NAME,
+    FMBENCH_RESULTS_FOLDER_PATTERN,
+    IMDS_ENDPOINT,
+    IMDS_REQUEST_TIMEOUT_IN_SECONDS,
+    IMDS_TOKEN_TTL_IN_SECONDS,
+    MAX_INSTANCE_COUNT,
+    MAX_PARALLEL_EC2_INSTANCE_LAUNCHES,
+    MAX_PARALLEL_FILE_UPLOADS_PER_INSTANCE,
+    MAX_WAIT_TIME_FOR_STARTUP_SCRIPT_IN_SECONDS,
+    MIN_INSTANCE_COUNT,
+    SCRIPT_CHECK_INTERVAL_IN_SECONDS,
+    SSH_BANNER_TIMEOUT_IN_SECONDS,
+    SSH_CHANNEL_TIMEOUT_IN_SECONDS,
+    SSH_CONNECT_TIMEOUT_IN_SECONDS,
+    SSH_KEEPALIVE_INTERVAL_IN_SECONDS,
+    STARTUP_COMPLETE_FLAG_FPATH,
+)
 from pathlib import Path
 from scp import SCPClient
 from jinja2 import Template
+from botocore.config import Config
 from collections import defaultdict
-from typing import Optional, List, Tuple, Any
+from typing import Optional, List, Dict, Tuple, Any, Union
 from concurrent.futures import ThreadPoolExecutor
-from botocore.exceptions import NoCredentialsError, ClientError
+from botocore.exceptions import NoCredentialsError, ClientError, WaiterError
 
 # set a logger
 logger = logging.getLogger(__name__)
 
-executor = ThreadPoolExecutor()
+# use the libyaml backed loader when PyYAML was built with it, it parses
+# the same documents as yaml.SafeLoader but considerably faster
+try:
+    from yaml import CSafeLoader as YamlSafeLoader
+except ImportError:
+    from yaml import SafeLoader as YamlSafeLoader
+
+# botocore config used for every boto3 client and resource
+BOTO3_CLIENT_CONFIG: Config = Config(
+    tcp_keepalive=True,
+    max_pool_connections=BOTO3_MAX_POOL_CONNECTIONS,
+    retries={"max_attempts": BOTO3_MAX_RETRY_ATTEMPTS, "mode": BOTO3_RETRY_MODE},
+    connect_timeout=BOTO3_CONNECT_TIMEOUT_IN_SECONDS,
+    read_timeout=BOTO3_READ_TIMEOUT_IN_SECONDS,
+)
+
+# boto3 clients are thread safe but creating them from a shared session
+# is not, so client creation is serialized with this lock
+_boto3_client_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_boto3_session() -> boto3.session.Session:
+    """
+    Returns the boto3 session that all the clients are created from, so that credentials
+    are resolved and the service models are loaded once per process. The session is
+    created on first use, after get_region had a chance to set AWS_DEFAULT_REGION.
+    """
+    return boto3.session.Session()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_boto3_client(service_name: str, region_name: Optional[str] = None):
+    """
+    Returns a boto3 client for the given service and region. Creating a client loads
+    the service model and builds the endpoint resolver so clients are created once per
+    (service, region) and reused for the rest of the run.
+    """
+    with _boto3_client_lock:
+        return _get_boto3_session().client(
+            service_name, region_name=region_name, config=BOTO3_CLIENT_CONFIG
+        )
 
+@functools.lru_cache(maxsize=None)
 def _get_latest_version(package_name: str) -> Optional[str]:
     url = f"https://pypi.org/pypi/{package_name}/json"
     response = requests.get(url)
@@ -39,6 +119,42 @@ def _get_latest_version(package_name: str) -> Optional[str]:
         version = None
     return version
 
+@functools.lru_cache(maxsize=1)
+def _fetch_region() -> str:
+    """
+    Determines the region from the boto3 session or the EC2 instance metadata API. The
+    region does not change during a run so a successful lookup is cached, a failure
+    raises and is not cached so that the next call tries again.
+    """
+    region_name = boto3.session.Session().region_name
+    if region_name is None:
+        logger.info(
+            f"boto3.session.Session().region_name is {region_name}, "
+            f"going to use an metadata api to determine region name"
+        )
+        # THIS CODE ASSUMED WE ARE RUNNING ON EC2, for everything else
+        # the boto3 session should be sufficient to retrieve region name
+        with requests.Session() as imds_session:
+            resp = imds_session.put(
+                f"{IMDS_ENDPOINT}/latest/api/token",
+                headers={"X-aws-ec2-metadata-token-ttl-seconds": str(IMDS_TOKEN_TTL_IN_SECONDS)},
+                timeout=IMDS_REQUEST_TIMEOUT_IN_SECONDS,
+            )
+            resp.raise_for_status()
+            resp = imds_session.get(
+                f"{IMDS_ENDPOINT}/latest/meta-data/placement/region",
+                headers={"X-aws-ec2-metadata-token": resp.text},
+                timeout=IMDS_REQUEST_TIMEOUT_IN_SECONDS,
+            )
+            resp.raise_for_status()
+            region_name = resp.text
+        logger.info(
+            f"region_name={region_name}, also setting the AWS_DEFAULT_REGION env var"
+        )
+        os.environ["AWS_DEFAULT_REGION"] = region_name
+    return region_name
+
+
 def get_region() -> str:
     """
     This function fetches the current region where this orchestrator is running using the 
@@ -46,63 +162,77 @@ def get_region() -> str:
     the API.
     """
     try:
-        session = boto3.session.Session()
-        region_name = session.region_name
-        if region_name is None:
-            logger.info(
-                f"boto3.session.Session().region_name is {region_name}, "
-                f"going to use an metadata api to determine region name"
-            )
-            # THIS CODE ASSUMED WE ARE RUNNING ON EC2, for everything else
-            # the boto3 session should be sufficient to retrieve region name
-            resp = requests.put(
-                "http://169.254.169.254/latest/api/token",
-                headers={"X-aws-ec2-metadata-token-ttl-seconds": "21600"},
-            )
-            token = resp.text
-            region_name = requests.get(
-                "http://169.254.169.254/latest/meta-data/placement/region",
-                headers={"X-aws-ec2-metadata-token": token},
-            ).text
-            logger.info(
-                f"region_name={region_name}, also setting the AWS_DEFAULT_REGION env var"
-            )
-            os.environ["AWS_DEFAULT_REGION"] = region_name
+        region_name = _fetch_region()
         logger.info(f"region_name={region_name}")
     except Exception as e:
         logger.error(f"Could not fetch the region: {e}")
         region_name = None
     return region_name
 
-def _normalize_yaml_param_spacing(template_content: str, variable_name: str) -> str:
+
+# a plain '{{ name }}' placeholder, configs that only use these are rendered without Jinja2
+_SIMPLE_PLACEHOLDER_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+# line endings as recognized by Jinja2
+_NEWLINE_RE = re.compile(r"\r\n|\r|\n")
+# '{{ gpu }}', '{{cpu}}', '{{ neuron}}' etc. with any spacing, these are normalized to '{gpu}' etc.
+_AMI_TYPE_PLACEHOLDER_RE = re.compile(r"\{\{\s*(gpu|cpu|neuron)\s*\}\}")
+
+
+@functools.lru_cache(maxsize=128)
+def _read_yaml_template(config_file_path: str, mtime_ns: int) -> str:
     """
-    Replaces all possible spacing combinations of '{{ gpu_ami}}' with '{{gpu_ami}}'.
-    
-    Parameters:
-    - template_content (str): The content of the template with potential spacing around 'gpu_ami'.
-    - param_name (str): The name of the parameter to fix spacing
+    Reads the yml file and normalizes its placeholders. The result is cached, the
+    modification time is part of the cache key so an edited file is read again.
+    """
+    # read the yml file as raw text
+    template_content = Path(config_file_path).read_text()
+
+    # Normalize the spacing, so {{ gpu }} and {{ gpu}} etc all get converted
+    # to {gpu}, all three parameters are handled in a single pass
+    return _AMI_TYPE_PLACEHOLDER_RE.sub(r"{\1}", template_content)
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_yaml_template(template_content: str) -> Template:
+    """
+    Compiles the template content into a Jinja2 template, compiling is the expensive
+    part of rendering so the compiled template is cached.
+    """
+    return Template(template_content)
+
+
+def _render_simple_yaml_template(template_content: str, context: Dict) -> Optional[str]:
+    """
+    Renders a template that only contains plain '{{ name }}' placeholders for variables in
+    the context with a regex substitution, producing the same output as Jinja2 would.
+
     Returns:
-    - str: The template content with normalized '{{gpu_ami}}' placeholders.
+        Optional[str]: The rendered content, or None if the template uses any other Jinja2
+                       syntax and has to be rendered by Jinja2.
     """
-    
-    # Define the regex pattern to match '{{ gpu_ami}}' with any possible spacing
-    pattern = r"\{\{\s*" + re.escape(variable_name) + r"\s*\}\}"
-    
-    # Replace all occurrences of the pattern with '{{gpu_ami}}'
-    normalized_content = re.sub(pattern, f"{{{variable_name}}}", template_content)
-    
-    return normalized_content
+    if "{%" in template_content or "{#" in template_content:
+        return None
+    if "{{" not in template_content:
+        # nothing to substitute, e.g. a config that has already been rendered
+        rendered = template_content
+    else:
+        placeholders = _SIMPLE_PLACEHOLDER_RE.findall(template_content)
+        if len(placeholders) != template_content.count("{{"):
+            return None
+        if any(name not in context for name in placeholders):
+            return None
+        rendered = _SIMPLE_PLACEHOLDER_RE.sub(
+            lambda m: str(context[m.group(1)]), template_content
+        )
+    # Jinja2 normalizes line endings to '\n' and drops a single trailing newline
+    lines = _NEWLINE_RE.split(rendered)
+    if lines[-1] == "":
+        del lines[-1]
+    return "\n".join(lines)
 
 
 def _get_rendered_yaml(config_file_path: str, context: Dict) -> str:
     logger.info(f"config_file_path={config_file_path}")
-    # read the yml file as raw text
-    template_content = Path(config_file_path).read_text()
-
-    # Normalize the spacing, so {{ gpu }} and {{ gpu}} etc all get converted
-    # to {{gpu}}
-    for param in ['gpu', 'cpu', 'neuron']:
-        template_content = _normalize_yaml_param_spacing(template_content, param)
 
     # context contains region, config file etc.
     # context = {'region': global_region, 'config_file': fmbench_config_file, 'write_bucket': write_bucket}
@@ -115,10 +245,32 @@ def _get_rendered_yaml(config_file_path: str, context: Dict) -> str:
     # provide the value as a command line argument to the orchestrator then it
     # would get replaced by None and we would have no fmbench config file and the 
     # code would raise an exception that it cannot continue
-    template = Template(template_content)
-    rendered_yaml = template.render(context)
+    template_content = _read_yaml_template(
+        os.path.abspath(config_file_path), os.stat(config_file_path).st_mtime_ns
+    )
+    rendered_yaml = _render_simple_yaml_template(template_content, context)
+    if rendered_yaml is None:
+        rendered_yaml = _compile_yaml_template(template_content).render(context)
     return rendered_yaml
 
+@functools.lru_cache(maxsize=128)
+def _parse_static_yaml_file(file_path: str, mtime_ns: int) -> Dict:
+    """
+    Parses a YAML file that is not templated. The modification time is part
+    of the cache key so an edited file is parsed again on the next call.
+    """
+    logger.info(f"parsing {file_path}, mtime_ns={mtime_ns}")
+    return yaml.load(Path(file_path).read_text(), Loader=YamlSafeLoader)
+
+
+def _load_static_yaml_file(file_path: str) -> Dict:
+    """
+    Returns the parsed contents of a YAML file that is not templated, such as the
+    AMI mapping. The returned dict is shared between callers and must not be modified.
+    """
+    return _parse_static_yaml_file(os.path.abspath(file_path), os.stat(file_path).st_mtime_ns)
+
+
 def load_yaml_file(config_file_path: str,
                    ami_mapping_file_path: str,
                    fmbench_config_file: Optional[str],
@@ -148,37 +300,44 @@ def load_yaml_file(config_file_path: str,
 
     rendered_yaml = _get_rendered_yaml(config_file_path, context)
     # yaml to json
-    config_data = yaml.safe_load(rendered_yaml)
+    config_data = yaml.load(rendered_yaml, Loader=YamlSafeLoader)
 
     rendered_yaml = _get_rendered_yaml(infra_config_file, context)
     # yaml to json
-    infra_config_data = yaml.safe_load(rendered_yaml)
+    infra_config_data = yaml.load(rendered_yaml, Loader=YamlSafeLoader)
 
-    # merge the two configs
-    config_data = config_data | infra_config_data
+    # merge the two configs, both dicts were just parsed and are not shared
+    # so the infra config is merged into the main config in place
+    config_data.update(infra_config_data)
 
     # Fetch the AMI mapping file
-    ami_mapping =  yaml.safe_load(Path(ami_mapping_file_path).read_text())
+    ami_mapping = _load_static_yaml_file(ami_mapping_file_path)
 
     # at this time any instance of ami_id: ami-something would remain as is
     # but any instance ami_id: gpu have been converted to ami_id: {gpu: None}
     # so we will iterate through the instance to replace ami_id with region specific
     # ami_id values from the ami_mapping we have. We have to do this because jinja2 does not
     # support nested variables and all other options added unnecessary complexity
+    # the instance dicts are updated in place
     for i, instance in enumerate(config_data['instances']):
         if instance.get('region') is None:
-            config_data['instances'][i]['region'] = global_region
+            instance['region'] = global_region
             region = global_region
         else:
             region = instance['region']
         ami_id = instance['ami_id']
 
         if isinstance(ami_id, dict):
-            # name of the first key, could be gpu, cpu, neuron or others in future
-            ami_key = next(iter(ami_id))
+            # name of the ami type, could be gpu, cpu, neuron or others in future,
+            # exactly one type is expected so anything else is a config error
+            if len(ami_id) != 1:
+                raise Exception(f"instance {i+1}, instance_type={instance['instance_type']}, "
+                                f"expected a single ami type in ami_id, got {list(ami_id)}, cannot continue")
+            (ami_key,) = ami_id
             ami_id_from_config = None
-            if ami_mapping.get(region):
-                ami_id_from_config = ami_mapping[region].get(ami_key)
+            region_ami_mapping = ami_mapping.get(region)
+            if region_ami_mapping:
+                ami_id_from_config = region_ami_mapping.get(ami_key)
                 if ami_id_from_config is None:
                     logger.error(f"instance {i+1}, instance_type={instance['instance_type']}, no ami found for {region} type {ami_key}")
                     raise Exception(f"instance {i+1}, instance_type={instance['instance_type']}, no ami found for {region} type {ami_key}")
@@ -187,7 +346,7 @@ def load_yaml_file(config_file_path: str,
                 raise Exception(f"instance {i+1}, instance_type={instance['instance_type']}, no info found in region {region} in {ami_mapping_file_path}, cannot continue")
             logger.info(f"instance {i+1}, instance_type={instance['instance_type']}, ami_key={ami_key}, region={region}, ami_id_from_config={ami_id_from_config}")
             # set the ami id
-            config_data['instances'][i]['ami_id'] = ami_id_from_config
+            instance['ami_id'] = ami_id_from_config
         elif isinstance(ami_id, str):
             logger.info(f"instance {i+1}, instance_type={instance['instance_type']}, region={region}, ami_id={ami_id}")
         else:
@@ -204,12 +363,35 @@ def load_yaml_file(config_file_path: str,
 
                 if fmbench_config_paths[j].startswith(FMBENCH_CFG_PREFIX):
                     fmbench_config_paths[j] = fmbench_config_paths[j].replace(FMBENCH_CFG_PREFIX, FMBENCH_CFG_GH_PREFIX)
-            config_data['instances'][i]['fmbench_config'] = fmbench_config_paths
+            instance['fmbench_config'] = fmbench_config_paths
 
     return config_data
 
 
-def _get_security_group_id_by_name(region: str, group_name: str, vpc_id: int) -> str:
+def _get_default_vpc_id(region: str) -> Optional[str]:
+    """
+    Returns the ID of the default VPC of the region, security groups created without a
+    VPC ID and instances launched without a subnet are placed in this VPC.
+
+    Args:
+        region (str): The AWS region.
+
+    Returns:
+        Optional[str]: The default VPC ID, or None if the region has no default VPC.
+    """
+    try:
+        response = _get_boto3_client("ec2", region).describe_vpcs(
+            Filters=[{"Name": "isDefault", "Values": ["true"]}]
+        )
+        if response["Vpcs"]:
+            return response["Vpcs"][0]["VpcId"]
+        logger.info(f"no default VPC found in {region}")
+    except Exception as e:
+        logger.error(f"Error retrieving the default VPC in {region}: {e}")
+    return None
+
+
+def _get_security_group_id_by_name(region: str, group_name: str, vpc_id: Optional[str]) -> str:
     """
     Retrieve the security group ID based on its name and VPC ID.
 
@@ -222,20 +404,23 @@ def _get_security_group_id_by_name(region: str, group_name: str, vpc_id: int) ->
         str: The security group ID if found, None otherwise.
     """
     try:
-        ec2_client = boto3.client("ec2", region_name=region)
+        ec2_client = _get_boto3_client("ec2", region)
         security_group_id: Optional[str] = None
-        response = ec2_client.describe_security_groups(
-            Filters=[
-                {"Name": "group-name", "Values": [group_name]},
-            ]
-        )
+        filters: List[Dict] = [{"Name": "group-name", "Values": [group_name]}]
+        # filter on the VPC as well so that only the group in the requested VPC is returned,
+        # without a VPC ID the group belongs in the default VPC where the instances are launched
+        if vpc_id is None:
+            vpc_id = _get_default_vpc_id(region)
+        if vpc_id is not None:
+            filters.append({"Name": "vpc-id", "Values": [vpc_id]})
+        response = ec2_client.describe_security_groups(Filters=filters)
         # If security group exists, return the ID
         if response["SecurityGroups"]:
             security_group_id = response["SecurityGroups"][0]["GroupId"]
         else:
-            logger.error(f"Security group '{group_name}' not found in VPC '{vpc_id}'.")
+            logger.info(f"Security group '{group_name}' not found in VPC '{vpc_id}'.")
     except Exception as e:
-        logger.INFO(f"Error retrieving security group: {e}")
+        logger.error(f"Error retrieving security group: {e}")
         security_group_id = None
     return security_group_id
 
@@ -255,9 +440,15 @@ def create_security_group(
     Returns:
         str: ID of the created security group.
     """
+    # Look for an existing security group first, on repeated runs the group already
+    # exists and this avoids a create call that fails followed by a second describe
+    security_group_id: Optional[str] = _get_security_group_id_by_name(region, group_name, vpc_id)
+    if security_group_id is not None:
+        logger.info(f"Security Group '{group_name}' already exists: {security_group_id}")
+        return security_group_id
     try:
         # Initialize the EC2 client
-        ec2_client = boto3.client("ec2", region_name=region)
+        ec2_client = _get_boto3_client("ec2", region)
         security_group_id: Optional[str] = None
         # Define parameters for creating the security group
         params: Dict = {
@@ -298,7 +489,7 @@ def authorize_inbound_rules(security_group_id: str, region: str):
     """
     try:
         # Initialize the EC2 client
-        ec2_client = boto3.client("ec2", region_name=region)
+        ec2_client = _get_boto3_client("ec2", region)
         # Authorize inbound rules
         ec2_client.authorize_security_group_ingress(
             GroupId=security_group_id,
@@ -327,6 +518,21 @@ def authorize_inbound_rules(security_group_id: str, region: str):
             logger.error(f"Error authorizing inbound rules: {e}")
 
 
+def _key_pair_exists(key_name: str, region: str) -> bool:
+    """
+    Check if a key pair exists in the given region. Describing the key pair by name
+    raises InvalidKeyPair.NotFound if it does not exist.
+    """
+    ec2_client = _get_boto3_client("ec2", region)
+    try:
+        ec2_client.describe_key_pairs(KeyNames=[key_name])
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "InvalidKeyPair.NotFound":
+            raise
+        return False
+
+
 def create_key_pair(key_name: str, region: str, delete_key_pair_if_present: bool) -> str:
     """
     Create a new key pair for EC2 instances.
@@ -340,14 +546,9 @@ def create_key_pair(key_name: str, region: str, delete_key_pair_if_present: bool
     """
     try:
         # Initialize the EC2 client
-        ec2_client = boto3.client("ec2", region_name=region)
+        ec2_client = _get_boto3_client("ec2", region)
         # check if key pair exists
-        kp_exists: bool = False
-        kp_list_response = ec2_client.describe_key_pairs(KeyNames=[])
-        for kp in kp_list_response['KeyPairs']:
-            if kp['KeyName'] == key_name:
-                kp_exists = True
-                break
+        kp_exists: bool = _key_pair_exists(key_name, region)
         if kp_exists is True:
             if delete_key_pair_if_present is True:
                 logger.info(f"key pair {key_name} does exist, going to delete it now")
@@ -371,11 +572,50 @@ def create_key_pair(key_name: str, region: str, delete_key_pair_if_present: bool
     return key_material
 
 
+def _get_run_instances_template(
+    ami: str,
+    key_name: str,
+    security_group_id: str,
+    iam_arn: str,
+    device_name: str,
+    ebs_del_on_termination: bool,
+    ebs_Iops: int,
+    ebs_VolumeSize: int,
+    ebs_VolumeType: str,
+) -> Dict:
+    """
+    Returns the run_instances parameters that do not change between instances
+    launched with the same AMI, key pair, security group, IAM role and EBS settings.
+    A new dict is built on every call so that parallel launches never share it.
+    """
+    return {
+        "BlockDeviceMappings": [
+            {
+                "DeviceName": device_name,
+                "Ebs": {
+                    "DeleteOnTermination": ebs_del_on_termination,
+                    "Iops": ebs_Iops,
+                    "VolumeSize": ebs_VolumeSize,
+                    "VolumeType": ebs_VolumeType,
+                },
+            },
+        ],
+        "ImageId": ami,
+        "KeyName": key_name,  # Name of the key pair
+        "SecurityGroupIds": [security_group_id],  # Security group ID
+        "MinCount": MIN_INSTANCE_COUNT,  # Minimum number of instances to launch
+        "MaxCount": MAX_INSTANCE_COUNT,  # Maximum number of instances to launch
+        "IamInstanceProfile": {  # IAM role to associate with the instance
+            "Arn": iam_arn
+        },
+    }
+
+
 def create_ec2_instance(
     idx: int,
     key_name: str,
     security_group_id: str,
-    user_data_script: str,
+    user_data_script: Union[str, bytes],
     ami: str,
     instance_type: str,
     iam_arn: str,
@@ -396,7 +636,7 @@ def create_ec2_instance(
         idx (int): Index or identifier for the instance.
         key_name (str): The name of the key pair to associate with the instance.
         security_group_id (str): The ID of the security group to associate with the instance.
-        user_data_script (str): The script to run on startup.
+        user_data_script (str or bytes): The script to run on startup, as text or gzip compressed bytes.
         ami (str): The ID of the AMI to use for the instance.
         instance_type (str): The type of instance to launch.
         iam_arn (str): The ARN of the IAM role to associate with the instance.
@@ -412,7 +652,7 @@ def create_ec2_instance(
     Returns:
         str: The ID of the created instance.
     """
-    ec2_resource = boto3.resource("ec2", region_name=region)
+    ec2_client = _get_boto3_client("ec2", region)
     instance_id: Optional[str] = None
     try:
         instance_name: str = f"FMBench-{instance_type}-{idx}"
@@ -426,29 +666,23 @@ def create_ec2_instance(
         elif CapacityReservationPreference:
             capacity_reservation_spec["CapacityReservationPreference"] = CapacityReservationPreference
 
-        # Create a new EC2 instance with user data
-        instances = ec2_resource.create_instances(
-            BlockDeviceMappings=[
-                {
-                    "DeviceName": device_name,
-                    "Ebs": {
-                        "DeleteOnTermination": ebs_del_on_termination,
-                        "Iops": ebs_Iops,
-                        "VolumeSize": ebs_VolumeSize,
-                        "VolumeType": ebs_VolumeType,
-                    },
-                },
-            ],
-            ImageId=ami,
+        # Create a new EC2 instance with user data, the parameters that are common
+        # across instances come from the run instances template
+        run_instances_template = _get_run_instances_template(
+            ami,
+            key_name,
+            security_group_id,
+            iam_arn,
+            device_name,
+            ebs_del_on_termination,
+            ebs_Iops,
+            ebs_VolumeSize,
+            ebs_VolumeType,
+        )
+        response = ec2_client.run_instances(
+            **run_instances_template,
             InstanceType=instance_type,  # Instance type
-            KeyName=key_name,  # Name of the key pair
-            SecurityGroupIds=[security_group_id],  # Security group ID
             UserData=user_data_script,  # The user data script to run on startup
-            MinCount=MIN_INSTANCE_COUNT,  # Minimum number of instances to launch
-            MaxCount=MAX_INSTANCE_COUNT,  # Maximum number of instances to launch
-            IamInstanceProfile={  # IAM role to associate with the instance
-                "Arn": iam_arn
-            },
             CapacityReservationSpecification=capacity_reservation_spec,
             TagSpecifications=[
                 {
@@ -459,8 +693,9 @@ def create_ec2_instance(
             ],
         )
 
+        instances = response.get("Instances")
         if instances:
-            instance_id = instances[0].id
+            instance_id = instances[0]["InstanceId"]
             logger.info(f"EC2 Instance '{instance_id}', '{instance_name}' created successfully with user data.")
         else:
             logger.error("Instances could not be created")
@@ -470,6 +705,52 @@ def create_ec2_instance(
     return instance_id
 
 
+@functools.lru_cache(maxsize=None)
+def prepare_user_data(user_data_script: str) -> bytes:
+    """
+    Gzip compress a user data script. cloud-init detects the gzip header and
+    decompresses the script before running it, compressing it once keeps the
+    RunInstances requests for instances sharing a script small and lets boto3
+    reuse the same bytes for every launch.
+
+    Args:
+        user_data_script (str): The script to run on startup.
+
+    Returns:
+        bytes: The gzip compressed user data script.
+    """
+    return gzip.compress(user_data_script.encode("utf-8"))
+
+
+def create_ec2_instances_parallel(
+    instance_specs: List[Dict],
+    max_workers: int = MAX_PARALLEL_EC2_INSTANCE_LAUNCHES,
+) -> List[Optional[str]]:
+    """
+    Create multiple EC2 instances in parallel. Each instance is launched with its own
+    create_ec2_instance call (MinCount=MaxCount=1) so a failure to launch one instance
+    does not affect the others.
+
+    Args:
+        instance_specs (list): List of dictionaries containing the keyword arguments for create_ec2_instance.
+        max_workers (int): Maximum number of instances to launch concurrently.
+
+    Returns:
+        list: The instance IDs in the same order as instance_specs, None for instances that could not be created.
+    """
+    if not instance_specs:
+        return []
+    # the fmbench version used for tagging the instances is fetched from PyPI once
+    # here so that the parallel launches all reuse the cached value
+    _get_latest_version(FMBENCH_PACKAGE_NAME)
+    num_workers: int = min(max_workers, len(instance_specs))
+    with ThreadPoolExecutor(max_workers=num_workers) as launch_executor:
+        instance_ids = list(
+            launch_executor.map(lambda spec: create_ec2_instance(**spec), instance_specs)
+        )
+    return instance_ids
+
+
 def delete_ec2_instance(instance_id: str, region: str) -> bool:
     """
     Deletes an EC2 instance given its instance ID.
@@ -482,10 +763,13 @@ def delete_ec2_instance(instance_id: str, region: str) -> bool:
         bool: True if the instance was deleted successfully, False otherwise.
     """
     try:
-        ec2_client = boto3.client("ec2", region_name=region)
+        ec2_client = _get_boto3_client("ec2", region)
         has_instance_terminated: Optional[bool] = None
         # Terminate the EC2 instance
         response = ec2_client.terminate_instances(InstanceIds=[instance_id])
+        # the hostname of a terminated instance is released, forget it
+        for public_dns in (True, False):
+            _ec2_hostname_and_username_cache.pop((instance_id, region, public_dns), None)
         if response is not None:
             logger.info(f"Instance {instance_id} has been terminated.")
             has_instance_terminated = True
@@ -498,6 +782,11 @@ def delete_ec2_instance(instance_id: str, region: str) -> bool:
     return has_instance_terminated
 
 
+# lower case AMI names keyed by (region, ami id), the name of an AMI never changes
+# and instances usually share an AMI so each AMI is described once
+_ami_name_cache: Dict[Tuple[str, str], str] = {}
+
+
 def _determine_username(ami_id: str, region: str):
     """
     Determine the appropriate username based on the AMI ID or name.
@@ -509,17 +798,20 @@ def _determine_username(ami_id: str, region: str):
         str: The username for the EC2 instance.
     """
     try:
-        ec2_client = boto3.client("ec2", region)
-        # Describe the AMI to get its name
-        response = ec2_client.describe_images(ImageIds=[ami_id])
-        ec2_username: Optional[str] = None
-        if response is not None:
-            ami_name = response["Images"][0][
-                "Name"
-            ].lower()  # Convert AMI name to lowercase
-        else:
-            logger.error(f"Could not describe the ec2 image")
-            return
+        cache_key = (region, ami_id)
+        ami_name = _ami_name_cache.get(cache_key)
+        if ami_name is None:
+            ec2_client = _get_boto3_client("ec2", region)
+            # Describe the AMI to get its name
+            response = ec2_client.describe_images(ImageIds=[ami_id])
+            if response is not None:
+                ami_name = response["Images"][0][
+                    "Name"
+                ].lower()  # Convert AMI name to lowercase
+                _ami_name_cache[cache_key] = ami_name
+            else:
+                logger.error(f"Could not describe the ec2 image")
+                return
         # Match the AMI name to determine the username
         for key in AMI_USERNAME_MAP:
             if key in ami_name:
@@ -533,8 +825,104 @@ def _determine_username(ami_id: str, region: str):
     return ec2_username
 
 
+def _describe_ec2_instances(instance_ids: List[str], region: str) -> Dict[str, Dict]:
+    """
+    Describes the given EC2 instances of a region with as few DescribeInstances calls as
+    possible, instead of one call per instance.
+
+    Args:
+        instance_ids (List[str]): The IDs of the EC2 instances.
+        region (str): The AWS region where the instances are located.
+
+    Returns:
+        Dict[str, Dict]: The instance descriptions keyed by instance ID. Instances that could
+                         not be described are left out.
+    """
+    instances: Dict[str, Dict] = {}
+    ec2_client = _get_boto3_client("ec2", region)
+    for i in range(0, len(instance_ids), DESCRIBE_INSTANCES_BATCH_SIZE):
+        batch = instance_ids[i:i + DESCRIBE_INSTANCES_BATCH_SIZE]
+        try:
+            response = ec2_client.describe_instances(InstanceIds=batch)
+        except ClientError as e:
+            logger.error(f"Error describing instances {batch} in {region}: {e}")
+            continue
+        for reservation in response["Reservations"]:
+            for instance in reservation["Instances"]:
+                instances[instance["InstanceId"]] = instance
+    return instances
+
+
+def _group_instance_ids_by_region(instance_id_list: List[str], instance_data_map: Dict) -> Dict[str, List[str]]:
+    """
+    Groups the instance ids by the region in their instance data, instances without
+    instance data or region are left out.
+    """
+    instance_ids_by_region: Dict[str, List[str]] = defaultdict(list)
+    for instance_id in instance_id_list:
+        config_entry = instance_data_map.get(instance_id)
+        if config_entry and config_entry.get("region"):
+            instance_ids_by_region[config_entry["region"]].append(instance_id)
+    return instance_ids_by_region
+
+
+def _wait_for_region_instances_running(region: str, region_instance_ids: List[str]) -> bool:
+    """
+    Waits until the EC2 instances of a single region are in the running state.
+
+    Args:
+        region (str): The AWS region where the instances are located.
+        region_instance_ids (list): List of EC2 instance IDs in the region.
+
+    Returns:
+        bool: True if all the instances are running, False otherwise.
+    """
+    logger.info(f"waiting for {len(region_instance_ids)} instances in {region} to be running")
+    try:
+        _get_boto3_client("ec2", region).get_waiter("instance_running").wait(
+            InstanceIds=region_instance_ids,
+            WaiterConfig={
+                "Delay": EC2_INSTANCE_RUNNING_CHECK_INTERVAL_IN_SECONDS,
+                "MaxAttempts": EC2_INSTANCE_RUNNING_MAX_CHECKS,
+            },
+        )
+        logger.info(f"instances {region_instance_ids} in {region} are running")
+        return True
+    except WaiterError as e:
+        logger.error(f"Error waiting for instances {region_instance_ids} in {region} to be running: {e}")
+        return False
+
+
+def wait_for_ec2_instances_running(instance_id_list: List[str], instance_data_map: Dict):
+    """
+    Waits until the EC2 instances are in the running state. Each check describes all the
+    instances of a region in one call rather than polling every instance separately, and
+    the regions are waited on in parallel.
+
+    Args:
+        instance_id_list (list): List of EC2 instance IDs.
+        instance_data_map (dict): Dict of the instance data keyed by instance id, used for the region.
+    """
+    instance_ids_by_region = _group_instance_ids_by_region(instance_id_list, instance_data_map)
+    if not instance_ids_by_region:
+        return
+    with ThreadPoolExecutor(max_workers=len(instance_ids_by_region)) as wait_executor:
+        list(
+            wait_executor.map(
+                _wait_for_region_instances_running,
+                instance_ids_by_region.keys(),
+                instance_ids_by_region.values(),
+            )
+        )
+
+
+# (hostname, username, instance name) of the instances keyed by (instance id, region, public_dns),
+# these do not change while an instance is running so each instance is looked up once
+_ec2_hostname_and_username_cache: Dict[Tuple[str, str, bool], Tuple] = {}
+
+
 def _get_ec2_hostname_and_username(
-    instance_id: str, region: str, public_dns=True
+    instance_id: str, region: str, public_dns=True, instance: Optional[Dict] = None
 ) -> Tuple:
     """
     Retrieve the public or private DNS name (hostname) and username of an EC2 instance.
@@ -542,18 +930,25 @@ def _get_ec2_hostname_and_username(
         instance_id (str): The ID of the EC2 instance.
         region (str): The AWS region where the instance is located.
         public_dns (bool): If True, returns the public DNS; if False, returns the private DNS.
+        instance (Optional[Dict]): The description of the instance if it has already been
+                                   described, the instance is described if this is None.
 
     Returns:
         tuple: A tuple containing the hostname (public or private DNS) and username.
     """
+    cache_key = (instance_id, region, public_dns)
+    if cache_key in _ec2_hostname_and_username_cache:
+        return _ec2_hostname_and_username_cache[cache_key]
     try:
         hostname, username, instance_name = None, None, None
-        ec2_client = boto3.client("ec2", region_name=region)
-        # Describe the instance
-        response = ec2_client.describe_instances(InstanceIds=[instance_id])
-        if response is not None:
+        if instance is None:
+            ec2_client = _get_boto3_client("ec2", region)
+            # Describe the instance
+            response = ec2_client.describe_instances(InstanceIds=[instance_id])
+            if response is not None:
+                instance = response["Reservations"][0]["Instances"][0]
+        if instance is not None:
             # Extract instance information
-            instance = response["Reservations"][0]["Instances"][0]
             ami_id = instance.get(
                 "ImageId"
             )  # Get the AMI ID used to launch the instance
@@ -563,7 +958,7 @@ def _get_ec2_hostname_and_username(
             else:
                 hostname = instance.get("PrivateDnsName")
             # instance name
-            tags = response["Reservations"][0]["Instances"][0]["Tags"]
+            tags = instance["Tags"]
             logger.info(f"tags={tags}")
             instance_names = [t["Value"] for t in tags if t["Key"] == "Name"]
             if not instance_names:
@@ -572,11 +967,100 @@ def _get_ec2_hostname_and_username(
                 instance_name = instance_names[0]
         # Determine the username based on the AMI ID
         username = _determine_username(ami_id, region)
+        # an instance that is still starting up has no hostname yet, only cache complete results
+        if hostname and username:
+            _ec2_hostname_and_username_cache[cache_key] = (hostname, username, instance_name)
     except Exception as e:
         logger.info(f"Error fetching instance details (hostname and username): {e}")
     return hostname, username, instance_name
 
 
+# open SSH connections keyed by (hostname, username, key file), every SSH helper
+# reuses the connection to an instance instead of doing a new TCP connect, key
+# exchange and authentication for each operation
+_ssh_clients: Dict[Tuple[str, str, str], paramiko.SSHClient] = {}
+_ssh_clients_lock = threading.Lock()
+
+
+def _is_ssh_client_active(ssh_client: paramiko.SSHClient) -> bool:
+    """
+    Returns True if the SSH client is still connected.
+    """
+    transport = ssh_client.get_transport()
+    return transport is not None and transport.is_active()
+
+
+def _get_ssh_client(hostname: str, username: str, key_file_path: str) -> paramiko.SSHClient:
+    """
+    Returns a connected SSH client for the instance, reusing the open connection if there
+    is one. A connection that has been dropped is replaced by a new one. The returned
+    client is shared, callers must not close it.
+
+    Args:
+        hostname (str): The public IP or DNS of the EC2 instance.
+        username (str): The SSH username (e.g., 'ubuntu').
+        key_file_path (str): The path to the PEM key file.
+
+    Returns:
+        paramiko.SSHClient: The connected SSH client.
+    """
+    key = (hostname, username, key_file_path)
+    with _ssh_clients_lock:
+        ssh_client = _ssh_clients.get(key)
+        if ssh_client is not None:
+            if _is_ssh_client_active(ssh_client):
+                return ssh_client
+            logger.info(f"SSH connection to {hostname} as {username} is no longer active, reconnecting")
+            ssh_client.close()
+            del _ssh_clients[key]
+
+    # connect outside of the lock so that connections to different instances
+    # are not serialized behind each other
+    ssh_client = paramiko.SSHClient()
+    ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    ssh_client.connect(
+        hostname,
+        username=username,
+        key_filename=key_file_path,
+        timeout=SSH_CONNECT_TIMEOUT_IN_SECONDS,
+        banner_timeout=SSH_BANNER_TIMEOUT_IN_SECONDS,
+        auth_timeout=SSH_CONNECT_TIMEOUT_IN_SECONDS,
+        channel_timeout=SSH_CHANNEL_TIMEOUT_IN_SECONDS,
+    )
+    transport = ssh_client.get_transport()
+    transport.set_keepalive(SSH_KEEPALIVE_INTERVAL_IN_SECONDS)
+    # the SSH helpers send small commands and wait for short replies, disable Nagle's
+    # algorithm so these round trips are not delayed waiting for more data to batch
+    transport.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    logger.info(f"Connected to {hostname} as {username}")
+
+    with _ssh_clients_lock:
+        existing_client = _ssh_clients.get(key)
+        if existing_client is not None:
+            if _is_ssh_client_active(existing_client):
+                # another thread connected to the same instance in the meantime
+                ssh_client.close()
+                return existing_client
+            existing_client.close()
+        _ssh_clients[key] = ssh_client
+    return ssh_client
+
+
+def close_ssh_clients(hostname: Optional[str] = None):
+    """
+    Closes the open SSH connections, either all of them or only the ones to the given host.
+
+    Args:
+        hostname (Optional[str]): The host whose connections should be closed, all connections
+                                  are closed if this is None.
+    """
+    with _ssh_clients_lock:
+        keys = [k for k in _ssh_clients if hostname is None or k[0] == hostname]
+        ssh_clients = [_ssh_clients.pop(k) for k in keys]
+    for ssh_client in ssh_clients:
+        ssh_client.close()
+
+
 # Function to check for 'results-*' folders in the root directory of an EC2 instance
 def _check_for_results_folder(
     hostname: str, instance_name: str, username: str, key_file_path: str
@@ -596,15 +1080,8 @@ def _check_for_results_folder(
     try:
         # Initialize the result folders within fmbench
         fmbench_result_folders: Optional[List] = None
-        # Initialize the SSH client
-        ssh_client = paramiko.SSHClient()
-        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-        # Load the private key
-        private_key = paramiko.RSAKey.from_private_key_file(key_file_path)
-
-        # Connect to the instance
-        ssh_client.connect(hostname, username=username, pkey=private_key)
+        # Get the SSH connection to the instance
+        ssh_client = _get_ssh_client(hostname, username, key_file_path)
         logger.info(
             f"_check_for_results_folder, instance_name={instance_name}, connected to {hostname} as {username}"
         )
@@ -617,8 +1094,6 @@ def _check_for_results_folder(
         logger.info(
             f"_check_for_results_folder, instance_name={instance_name}, output={output}, error={error}"
         )
-        # Close the connection
-        ssh_client.close()
         if error:
             # No folder found or other errors
             logger.info(
@@ -660,15 +1135,8 @@ def _get_folder_from_instance(
     """
     try:
         folder_retrieved: bool = False
-        # Initialize the SSH client
-        ssh_client = paramiko.SSHClient()
-        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-        # Load the private key
-        private_key = paramiko.RSAKey.from_private_key_file(key_file_path)
-
-        # Connect to the instance
-        ssh_client.connect(hostname, username=username, pkey=private_key)
+        # Get the SSH connection to the instance
+        ssh_client = _get_ssh_client(hostname, username, key_file_path)
 
         # Use SCP to copy the folder
         with SCPClient(ssh_client.get_transport()) as scp:
@@ -676,8 +1144,6 @@ def _get_folder_from_instance(
         logger.info(
             f"Folder '{remote_folder}' retrieved successfully to '{local_folder}'."
         )
-        # Close the connection
-        ssh_client.close()
         folder_retrieved = True
     except Exception as e:
         logger.error(f"Error retrieving folder from {hostname} via SCP: {e}")
@@ -731,6 +1197,27 @@ def check_and_retrieve_results_folder(instance: Dict, local_folder_base: str):
             f"Error occured while attempting to check and retrieve results from the instances: {e}"
         )
 
+def reset_local_results_folder(instance: Dict, local_folder_base: str) -> str:
+    """
+    Clears out the local folder where the logs and results of an instance are saved and
+    recreates it empty. This is done once before the first config of the instance is run
+    so that the log and the results of a config can be fetched concurrently.
+
+    Args:
+        instance (dict): Dictionary containing instance details (instance_name).
+        local_folder_base (str): The local base path where the folders should be saved.
+
+    Returns:
+        str: The local folder for the instance.
+    """
+    local_folder = os.path.join(local_folder_base, instance["instance_name"])
+    if Path(local_folder).is_dir():
+        logger.info(f"going to delete {local_folder}")
+        shutil.rmtree(local_folder)
+    os.makedirs(local_folder, exist_ok=True)
+    return local_folder
+
+
 def get_fmbench_log(instance: Dict, local_folder_base: str, log_file_path: str, iter_count: int):
     """
     Checks for 'fmbench.log' file on a single EC2 instance and retrieves them if found.
@@ -753,27 +1240,16 @@ def get_fmbench_log(instance: Dict, local_folder_base: str, log_file_path: str,
     local_log_file = os.path.join(local_folder, f'fmbench_{iter_count}.log')
 
     try:
-        # Clear out the local folder if it exists, then recreate it
-        if Path(local_folder).is_dir() and iter_count == 1:
-            logger.info(f"going to delete {local_folder}, iter_count={iter_count}")
-            shutil.rmtree(local_folder)
         os.makedirs(local_folder, exist_ok=True)
 
-        # Setup SSH and SFTP connection using Paramiko
-        key = paramiko.RSAKey.from_private_key_file(key_file_path)
-        ssh_client = paramiko.SSHClient()
-        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh_client.connect(hostname=hostname, username=username, pkey=key)
+        # Get the SSH connection to the instance
+        ssh_client = _get_ssh_client(hostname, username, key_file_path)
 
         # Use SFTP to download the log file
-        sftp = ssh_client.open_sftp()
-        sftp.get(log_file_path, local_log_file)
+        with ssh_client.open_sftp() as sftp:
+            sftp.get(log_file_path, local_log_file)
         logger.info(f"Downloaded '{log_file_path}' to '{local_log_file}'")
 
-        # Close connections
-        sftp.close()
-        ssh_client.close()
-
     except Exception as e:
         logger.error(f"Error occurred while retrieving the log file from {instance_name}: {e}")
 
@@ -791,6 +1267,12 @@ def generate_instance_details(instance_id_list, instance_data_map):
     """
     instance_details = []
 
+    # describe the instances with one call per region rather than one call per instance
+    instance_ids_by_region = _group_instance_ids_by_region(instance_id_list, instance_data_map)
+    ec2_instances: Dict[str, Dict] = {}
+    for region, region_instance_ids in instance_ids_by_region.items():
+        ec2_instances.update(_describe_ec2_instances(region_instance_ids, region))
+
     for instance_id in instance_id_list:
 
         # If a config entry is found, get the config path
@@ -833,7 +1315,7 @@ def generate_instance_details(instance_id_list, instance_data_map):
 
         # Get the public hostname and username for each instance
         public_hostname, username, instance_name = _get_ec2_hostname_and_username(
-            instance_id, region, public_dns=True
+            instance_id, region, public_dns=True, instance=ec2_instances.get(instance_id)
         )
 
         # Append the instance details to the list if hostname and username are found
@@ -889,19 +1371,15 @@ def run_command_on_instances(
         )
         logger.info(f"Running command on {instance_name}, {hostname} as {username}...")
         try:
-            with paramiko.SSHClient() as ssh_client:
-                ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                private_key = paramiko.RSAKey.from_private_key_file(key_file_path)
-                ssh_client.connect(hostname, username=username, pkey=private_key)
-                logger.info(f"Connected to {hostname} as {username}")
-                stdin, stdout, stderr = ssh_client.exec_command(command)
-                # Wait for the command to complete
-                exit_status = stdout.channel.recv_exit_status()
-                results[hostname] = {
-                    "stdout": stdout.read().decode(),
-                    "stderr": stderr.read().decode(),
-                    "exit_status": exit_status,
-                }
+            ssh_client = _get_ssh_client(hostname, username, key_file_path)
+            stdin, stdout, stderr = ssh_client.exec_command(command)
+            # Wait for the command to complete
+            exit_status = stdout.channel.recv_exit_status()
+            results[hostname] = {
+                "stdout": stdout.read().decode(),
+                "stderr": stderr.read().decode(),
+                "exit_status": exit_status,
+            }
         except Exception as e:
             logger.error(f"Error connecting to {hostname} or executing command: {e}")
             results[hostname] = {"stdout": "", "stderr": str(e), "exit_status": -1}
@@ -931,44 +1409,50 @@ def upload_and_execute_script_invoke_shell(
     # Initialize the output
     output: str = ""
     try:
-        with paramiko.SSHClient() as ssh_client:
-            ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            private_key = paramiko.RSAKey.from_private_key_file(key_file_path)
-            ssh_client.connect(hostname, username=username, pkey=private_key)
-            logger.info(f"Connected to {hostname} as {username}")
-            remote_script_path = remote_script_path.format(username=username)
-            try:
-                with ssh_client.open_sftp() as sftp:
-                    with sftp.file(remote_script_path, "w") as remote_file:
-                        remote_file.write(script_content)
-                    logger.info(f"Script successfully uploaded to {remote_script_path}")
-            except Exception as e:
-                logger.error(f"Failed to upload script to {remote_script_path}: {e}")
-
-
-            with ssh_client.invoke_shell() as shell:
-                time.sleep(1)  # Give the shell some time to initialize
-
-                logger.info("Going to check if FMBench complete Flag exists in this instance, if it does, remove it")
-                # Check if fmbench flag exists, if it does, remove it:
-                shell.send("if [ -f /tmp/fmbench_completed.flag ]; then rm /tmp/fmbench_completed.flag; fi\n")
-                
-                time.sleep(1)
-
-                shell.send(f"chmod +x {remote_script_path}\n")
-                time.sleep(1)  # Wait for the command to complete
-
-                shell.send(
-                    f"nohup bash {remote_script_path} > $HOME/run_fmbench_nohup.log 2>&1 & disown\n"
-                )
-                time.sleep(1)  # Wait for the command to complete
+        ssh_client = _get_ssh_client(hostname, username, key_file_path)
+        remote_script_path = remote_script_path.format(username=username)
+        try:
+            with ssh_client.open_sftp() as sftp:
+                sftp.get_channel().settimeout(SSH_CHANNEL_TIMEOUT_IN_SECONDS)
+                with sftp.file(remote_script_path, "w") as remote_file:
+                    remote_file.write(script_content)
+                logger.info(f"Script successfully uploaded to {remote_script_path}")
+        except socket.timeout:
+            # let the outer handler drop the connection, the script is not launched
+            raise
+        except Exception as e:
+            logger.error(f"Failed to upload script to {remote_script_path}: {e}")
 
-                while shell.recv_ready():
-                    output += shell.recv(1024).decode("utf-8")
-                    time.sleep(2)  # Allow time for the command output to be captured
-                # Close the shell and connection
-                shell.close()
-                ssh_client.close()
+
+        with ssh_client.invoke_shell() as shell:
+            shell.settimeout(SSH_CHANNEL_TIMEOUT_IN_SECONDS)
+            time.sleep(1)  # Give the shell some time to initialize
+
+            logger.info("Going to check if FMBench complete Flag exists in this instance, if it does, remove it")
+            # Check if fmbench flag exists, if it does, remove it:
+            shell.send("if [ -f /tmp/fmbench_completed.flag ]; then rm /tmp/fmbench_completed.flag; fi\n")
+            
+            time.sleep(1)
+
+            shell.send(f"chmod +x {remote_script_path}\n")
+            time.sleep(1)  # Wait for the command to complete
+
+            shell.send(
+                f"nohup bash {remote_script_path} > $HOME/run_fmbench_nohup.log 2>&1 & disown\n"
+            )
+            time.sleep(1)  # Wait for the command to complete
+
+            while shell.recv_ready():
+                output += shell.recv(1024).decode("utf-8")
+                time.sleep(2)  # Allow time for the command output to be captured
+            # Close the shell, the connection stays open for reuse
+            shell.close()
+    except socket.timeout as e:
+        # the connection is unresponsive, drop it from the pool so that a retry
+        # starts over on a new connection instead of queueing behind this one
+        logger.error(f"SSH operation on {hostname} timed out: {e}")
+        close_ssh_clients(hostname)
+        output = ""
     except Exception as e:
         logger.error(f"Error connecting via SSH to {hostname}: {e}")
         output = ""
@@ -986,42 +1470,59 @@ async def download_config_async(url, download_dir=DOWNLOAD_DIR_FOR_CFG_FILES):
         )
         os.remove(local_path)
     # Run the blocking download operation in a separate thread
-    await asyncio.get_event_loop().run_in_executor(
-        executor, wget.download, url, local_path
-    )
+    await asyncio.to_thread(wget.download, url, local_path)
     return local_path
 
 
+# config file downloads keyed by URL, instances that share a config file await
+# the same download instead of each downloading (and overwriting) it again
+_config_download_tasks: Dict[str, asyncio.Task] = {}
+
+
+async def _download_config_once_async(url: str) -> str:
+    """
+    Downloads the config file at the given URL once per run and returns its local path.
+    A failed download is not cached so that it is attempted again by the next caller.
+    """
+    task = _config_download_tasks.get(url)
+    if task is None:
+        task = asyncio.ensure_future(download_config_async(url))
+        _config_download_tasks[url] = task
+    try:
+        # shield the shared download so that a cancelled caller does not cancel it for the others
+        return await asyncio.shield(task)
+    except Exception:
+        if _config_download_tasks.get(url) is task:
+            del _config_download_tasks[url]
+        raise
+
+
 async def upload_file_to_instance_async(
     hostname, username, key_file_path, file_paths
 ):
-    """Asynchronously uploads multiple files to the EC2 instance."""
-    
-    def upload_files():
-        # Initialize the SSH client
-        ssh_client = paramiko.SSHClient()
-        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-        # Load the private key
-        private_key = paramiko.RSAKey.from_private_key_file(key_file_path)
+    """
+    Asynchronously uploads multiple files to the EC2 instance. Up to
+    MAX_PARALLEL_FILE_UPLOADS_PER_INSTANCE files are uploaded at the same time, each
+    over its own channel on the instance's SSH connection.
+    """
 
-        # Connect to the instance
-        ssh_client.connect(hostname, username=username, pkey=private_key)
-        logger.info(f"Connected to {hostname} as {username}")
+    def upload_file(local_path: str, remote_path: str):
+        # Get the SSH connection to the instance
+        ssh_client = _get_ssh_client(hostname, username, key_file_path)
 
-        # Upload the files
+        # Upload the file
         with SCPClient(ssh_client.get_transport()) as scp:
-            for file_path in file_paths:
-                local_path = file_path['local']
-                remote_path = file_path['remote']
-                scp.put(local_path, remote_path)
-                logger.info(f"Uploaded {local_path} to {hostname}:{remote_path}")
+            scp.put(local_path, remote_path)
+        logger.info(f"Uploaded {local_path} to {hostname}:{remote_path}")
 
-        # Close the SSH connection
-        ssh_client.close()
+    upload_semaphore = asyncio.Semaphore(MAX_PARALLEL_FILE_UPLOADS_PER_INSTANCE)
 
-    # Run the blocking operation in a separate thread
-    await asyncio.to_thread(upload_files)
+    async def upload_file_async(file_path: Dict):
+        async with upload_semaphore:
+            # Run the blocking operation in a separate thread
+            await asyncio.to_thread(upload_file, file_path['local'], file_path['remote'])
+
+    await asyncio.gather(*[upload_file_async(file_path) for file_path in file_paths])
 
 # Asynchronous function to handle the configuration file
 async def handle_config_file_async(instance, config_file):
@@ -1033,7 +1534,7 @@ async def handle_config_file_async(instance, config_file):
     # Check if the config path is a URL
     if urllib.parse.urlparse(config_path).scheme in ("http", "https"):
         logger.info(f"Config is a URL. Downloading from {config_path}...")
-        local_config_path = await download_config_async(config_path)
+        local_config_path = await _download_config_once_async(config_path)
     else:
         # It's a local file path, use it directly
         local_config_path = config_path
@@ -1072,15 +1573,8 @@ def _check_completion_flag(
         bool: True if the flag file exists, False otherwise.
     """
     try:
-        # Initialize the SSH client
-        ssh_client = paramiko.SSHClient()
-        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-        # Load the private key
-        private_key = paramiko.RSAKey.from_private_key_file(key_file_path)
-
-        # Connect to the instance
-        ssh_client.connect(hostname, username=username, pkey=private_key)
+        # Get the SSH connection to the instance
+        ssh_client = _get_ssh_client(hostname, username, key_file_path)
 
         # Check if the flag file exists
         stdin, stdout, stderr = ssh_client.exec_command(
@@ -1089,9 +1583,6 @@ def _check_completion_flag(
         output = stdout.read().decode().strip()
         error = stderr.read().decode().strip()
 
-        # Close the connection
-        ssh_client.close()
-
         # Return True if the file exists, otherwise False
         return output == "File exists"
 
@@ -1100,7 +1591,7 @@ def _check_completion_flag(
         return False
 
 
-def wait_for_flag(
+async def wait_for_flag_async(
     instance,
     flag_file_path,
     log_file_path,
@@ -1108,17 +1599,22 @@ def wait_for_flag(
     check_interval=SCRIPT_CHECK_INTERVAL_IN_SECONDS,
 ) -> bool:
     """
-    Waits for the startup flag file on the EC2 instance, and returns the script if the flag file is found.
+    Asynchronously waits for a flag file on the EC2 instance. Only the SSH check for the flag
+    file runs in a separate thread, the wait between checks happens on the event loop so
+    waiting on many instances does not hold a thread per instance for the whole wait.
 
     Args:
         instance (dict): The dictionary containing instance details (hostname, username, key_file_path).
-        formatted_script (str): The bash script content to be executed.
-        remote_script_path (str): The remote path where the script should be saved on the instance.
-        max_wait_time (int): Maximum wait time in seconds (default: 600 seconds or 10 minutes).
-        check_interval (int): Interval time in seconds between checks (default: 30 seconds).
+        flag_file_path (str): The path to the flag file on the instance.
+        log_file_path (str): The path to the log file on the instance that can be tailed while waiting.
+        max_wait_time (int): Maximum wait time in seconds.
+        check_interval (int): Interval time in seconds between checks.
+
+    Returns:
+        bool: True if the flag file was found before max_wait_time expired, False otherwise.
     """
     end_time = time.time() + max_wait_time
-    startup_complete: bool = False
+    completed: bool = False
     logger.info(
         f"going to wait {max_wait_time}s for the startup script for {instance['instance_name']} to complete"
     )
@@ -1135,7 +1631,8 @@ def wait_for_flag(
         "-----------------------------------------------------------------------------------------------"
     )
     while time.time() < end_time:
-        completed = _check_completion_flag(
+        completed = await asyncio.to_thread(
+            _check_completion_flag,
             hostname=instance["hostname"],
             username=instance["username"],
             key_file_path=instance["key_file_path"],
@@ -1144,15 +1641,15 @@ def wait_for_flag(
         if completed is True:
             logger.info(f"{flag_file_path} flag file found!!")
             break
-        else:
-            time_remaining = end_time - time.time()
-            logger.warning(
-                f"Waiting for {flag_file_path}, instance_name={instance['instance_name']}..., seconds until timeout={int(time_remaining)}s"
-            )
-            time.sleep(check_interval)
-    logger.error(
-        f"max_wait_time={max_wait_time} expired and the script for {instance['hostname']} has still not completed, exiting, "
-    )
+        time_remaining = end_time - time.time()
+        logger.warning(
+            f"Waiting for {flag_file_path}, instance_name={instance['instance_name']}..., seconds until timeout={int(time_remaining)}s"
+        )
+        await asyncio.sleep(check_interval)
+    else:
+        logger.error(
+            f"max_wait_time={max_wait_time} expired and the script for {instance['hostname']} has still not completed, exiting, "
+        )
     return completed
 
 
@@ -1179,15 +1676,8 @@ def _put_folder_to_instance(
     """
     try:
         folder_uploaded: bool = False
-        # Initialize the SSH client
-        ssh_client = paramiko.SSHClient()
-        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-        # Load the private key
-        private_key = paramiko.RSAKey.from_private_key_file(key_file_path)
-
-        # Connect to the instance
-        ssh_client.connect(hostname, username=username, pkey=private_key)
+        # Get the SSH connection to the instance
+        ssh_client = _get_ssh_client(hostname, username, key_file_path)
 
         # Use SCP to copy the folder
         with SCPClient(ssh_client.get_transport()) as scp:
@@ -1195,8 +1685,6 @@ def _put_folder_to_instance(
         logger.info(
             f"Folder '{local_folder}' uploaded successfully to '{remote_folder}'."
         )
-        # Close the connection
-        ssh_client.close()
         folder_uploaded = True
     except Exception as e:
         logger.error(f"Error uploading folder to {hostname} via SCP: {e}")